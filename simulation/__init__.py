@@ -0,0 +1,22 @@
+# Social media interaction simulation: users like or dislike posts and both drift
+# in an "experimental" coordinate space. The interaction model (user types and their
+# mix) and the update rule applied on a like are pluggable strategies; the three
+# original experiments are the named VARIANTS.
+from .engine import SimulationArrays, error_metrics, simulate
+from .metrics import METRICS, ErrorMetrics
+from .models import Post, User, create_posts, create_users
+from .population import Distribution, Mixture, Triangular, Uniform
+from .ranking import RANKINGS, RankingPolicy, get_ranking
+from .strategies import (
+    BEHAVIORS,
+    MODELS,
+    UPDATE_RULES,
+    USER_TYPES,
+    VARIANTS,
+    InteractionModel,
+    RubberBand,
+    RunningAverage,
+    UserBehavior,
+    get_model,
+    get_update_rule,
+)
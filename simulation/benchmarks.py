@@ -0,0 +1,263 @@
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime, timezone
+
+import numpy as np
+
+from . import engine
+from .experiment import run_simulation, to_columns
+from .models import Post, User, create_posts, create_users
+from .strategies import VARIANTS, get_model, get_update_rule
+
+# Default size ladder; cases above the pair budget of a stage are skipped
+USER_LADDER = [100, 1000, 10000, 100000]
+POSTS_PER_USER_LADDER = [1, 5, 50]
+STAGES = ['create_users', 'decide_interaction', 'interact', 'sweep_python', 'sweep_numpy', 'sweep_numba', 'dataframes',
+          'plots', 'plots_fast']
+
+# Largest amount of work each stage is asked to do in one case (pairs, users or rows)
+BUDGETS = {
+    'create_users': 10 ** 6,
+    'decide_interaction': 10 ** 6,
+    'interact': 10 ** 6,
+    'sweep_python': 2 * 10 ** 6,
+    'sweep_numpy': 2 * 10 ** 7,
+    'sweep_numba': 2 * 10 ** 7,
+    'dataframes': 10 ** 6,
+    'plots': 10 ** 5,
+    'plots_fast': 10 ** 7,
+}
+
+
+# Build users and posts for one case without running the sweep
+def build_population(variant, num_users, num_posts_per_user):
+    users = create_users(num_users, get_model(VARIANTS[variant]['model']))
+    return users, create_posts(users, num_posts_per_user)
+
+
+# Work done by one stage, as a zero-argument callable plus the number of items it processes.
+# Setup happens here so it is not part of the timing.
+def prepare(stage, variant, num_users, num_posts_per_user):
+    num_posts = num_users * num_posts_per_user
+    model = get_model(VARIANTS[variant]['model'])
+    quiet = contextlib.redirect_stdout(io.StringIO())
+
+    if stage == 'create_users':
+        return (lambda: create_users(num_users, model)), num_users
+    if stage in ('decide_interaction', 'interact'):
+        # Every user against a fixed sample of posts, so the pair count stays bounded
+        users, posts = build_population(variant, num_users, num_posts_per_user)
+        sample = posts[:max(1, BUDGETS[stage] // num_users)]
+        if stage == 'decide_interaction':
+            return (lambda: [user.decide_interaction(post) for user in users for post in sample]), \
+                len(users) * len(sample)
+        update_rule = get_update_rule(VARIANTS[variant]['update_rule'])
+        return (lambda: [post.interact(user, update_rule) for user in users for post in sample]), \
+            len(users) * len(sample)
+    if stage in ('sweep_python', 'sweep_numpy', 'sweep_numba'):
+        engine_name = stage[len('sweep_'):]
+
+        def sweep():
+            with quiet:
+                run_simulation(variant, num_users, num_posts_per_user, engine_name)
+        return sweep, num_users * num_posts
+    if stage == 'dataframes':
+        import pandas as pd
+        users, posts = build_population(variant, num_users, num_posts_per_user)
+
+        def frames():
+            pd.DataFrame(to_columns(users, User.__slots__))
+            pd.DataFrame(to_columns(posts, Post.__slots__))
+        return frames, num_users + num_posts
+    if stage == 'plots':
+        import matplotlib
+        matplotlib.use('Agg')
+        import matplotlib.pyplot as plt
+        import pandas as pd
+        from .plots import save_plots
+        sim = engine.SimulationArrays(num_users, num_posts)
+        engine.populate(sim, num_posts_per_user, model, np.random.default_rng(0))
+        user_df = pd.DataFrame(sim.user_columns(User.__slots__))
+        post_df = pd.DataFrame(sim.post_columns(Post.__slots__))
+
+        def plots():
+            with tempfile.TemporaryDirectory() as tmp:
+                save_plots(user_df, post_df, directory=tmp)
+                plt.close('all')
+        return plots, num_users + num_posts
+    if stage == 'plots_fast':
+        from .plots import FastPlotter
+        sim = engine.SimulationArrays(num_users, num_posts)
+        engine.populate(sim, num_posts_per_user, model, np.random.default_rng(0))
+        users = sim.user_columns(['x', 'y', 'experiment_x', 'experiment_y'])
+        posts = sim.post_columns(['post_id', 'x', 'y', 'experiment_x', 'experiment_y', 'quality', 'experiment_quality'])
+        plotter = FastPlotter()
+
+        def plots_fast():
+            with tempfile.TemporaryDirectory() as tmp:
+                plotter.save(users, posts, directory=tmp)
+        return plots_fast, num_users + num_posts
+    raise ValueError(f"Unknown stage {stage!r}")
+
+
+# Size of one case for budget purposes
+def case_size(stage, num_users, num_posts_per_user):
+    num_posts = num_users * num_posts_per_user
+    if stage == 'create_users':
+        return num_users
+    if stage in ('sweep_python', 'sweep_numpy', 'sweep_numba'):
+        return num_users * num_posts
+    if stage in ('decide_interaction', 'interact'):
+        return num_users * min(num_posts, max(1, BUDGETS[stage] // num_users))
+    return num_users + num_posts
+
+
+# Time one case (best of `repeat`) and then measure its peak traced allocation in a separate run
+def run_case(stage, variant, num_users, num_posts_per_user, repeat):
+    times = []
+    for _ in range(repeat):
+        work, items = prepare(stage, variant, num_users, num_posts_per_user)
+        start = time.perf_counter()
+        work()
+        times.append(time.perf_counter() - start)
+
+    work, items = prepare(stage, variant, num_users, num_posts_per_user)
+    tracemalloc.start()
+    work()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    best = min(times)
+    return {
+        'stage': stage,
+        'variant': variant,
+        'num_users': num_users,
+        'num_posts_per_user': num_posts_per_user,
+        'items': items,
+        'seconds': best,
+        'throughput': items / best if best else float('inf'),
+        'peak_bytes': peak,
+    }
+
+
+# Commit the results were measured on, if the tree is a git checkout
+def git_revision():
+    try:
+        return subprocess.run(['git', 'rev-parse', 'HEAD'], capture_output=True, text=True, check=True,
+                              cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def numba_version():
+    try:
+        import numba
+    except ImportError:
+        return None
+    return numba.__version__
+
+
+# Run every stage/variant/size combination within budget and return a results document
+def run_benchmarks(stages=STAGES, variants=None, users=USER_LADDER, posts_per_user=POSTS_PER_USER_LADDER, repeat=3):
+    results = []
+    for stage in stages:
+        for variant in variants or sorted(VARIANTS):
+            for num_users in users:
+                for num_posts_per_user in posts_per_user:
+                    if case_size(stage, num_users, num_posts_per_user) > BUDGETS[stage]:
+                        continue
+                    result = run_case(stage, variant, num_users, num_posts_per_user, repeat)
+                    results.append(result)
+                    print(f"{stage:<20}{variant:<8}{num_users:>8}{num_posts_per_user:>5}"
+                          f"{result['seconds']:>12.4f}s{result['throughput']:>14.0f}/s"
+                          f"{result['peak_bytes'] / 2 ** 20:>10.1f} MiB")
+    return {
+        'revision': git_revision(),
+        'timestamp': datetime.now(timezone.utc).isoformat(),
+        'python': platform.python_version(),
+        'numpy': np.__version__,
+        # sweep_numba only measures the compiled kernel when Numba was there
+        'numba': numba_version(),
+        'machine': platform.machine(),
+        'results': results,
+    }
+
+
+# Print the throughput ratio new/old for every case present in both result files
+def compare(old_path, new_path):
+    with open(old_path) as f:
+        old = json.load(f)
+    with open(new_path) as f:
+        new = json.load(f)
+
+    def key(result):
+        return result['stage'], result['variant'], result['num_users'], result['num_posts_per_user']
+
+    baseline = {key(result): result for result in old['results']}
+    print(f"{old['revision']} -> {new['revision']}")
+    for result in new['results']:
+        before = baseline.get(key(result))
+        if before is None:
+            continue
+        speedup = result['throughput'] / before['throughput']
+        memory = result['peak_bytes'] / before['peak_bytes'] if before['peak_bytes'] else float('nan')
+        print(f"{key(result)[0]:<20}{key(result)[1]:<8}{key(result)[2]:>8}{key(result)[3]:>5}"
+              f"  speed x{speedup:.2f}  memory x{memory:.2f}")
+
+
+# Print the throughput of each array engine's sweep over sweep_python's, for every case
+# the results hold for both
+def engine_speedups(document):
+    sweeps = {}
+    for result in document['results']:
+        if result['stage'].startswith('sweep_'):
+            case = result['variant'], result['num_users'], result['num_posts_per_user']
+            sweeps.setdefault(case, {})[result['stage']] = result['throughput']
+    for (variant, num_users, num_posts_per_user), throughput in sorted(sweeps.items()):
+        if 'sweep_python' not in throughput:
+            continue
+        for stage in ('sweep_numpy', 'sweep_numba'):
+            if stage in throughput:
+                print(f"{stage:<20}{variant:<8}{num_users:>8}{num_posts_per_user:>5}"
+                      f"  x{throughput[stage] / throughput['sweep_python']:.2f} over sweep_python")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark the simulation stages across a size ladder")
+    subparsers = parser.add_subparsers(dest='command', required=True)
+    run_parser = subparsers.add_parser('run')
+    run_parser.add_argument('--output', default='bench_results.json')
+    run_parser.add_argument('--stages', nargs='+', choices=STAGES, default=STAGES)
+    run_parser.add_argument('--variants', nargs='+', choices=sorted(VARIANTS))
+    run_parser.add_argument('--users', nargs='+', type=int, default=USER_LADDER)
+    run_parser.add_argument('--posts-per-user', nargs='+', type=int, default=POSTS_PER_USER_LADDER)
+    run_parser.add_argument('--repeat', type=int, default=3)
+    compare_parser = subparsers.add_parser('compare')
+    compare_parser.add_argument('old')
+    compare_parser.add_argument('new')
+    engines_parser = subparsers.add_parser('engines', help="Speed of the array engines relative to sweep_python")
+    engines_parser.add_argument('results')
+    args = parser.parse_args()
+
+    if args.command == 'compare':
+        compare(args.old, args.new)
+        sys.exit()
+    if args.command == 'engines':
+        with open(args.results) as f:
+            engine_speedups(json.load(f))
+        sys.exit()
+
+    document = run_benchmarks(args.stages, args.variants, args.users, args.posts_per_user, args.repeat)
+    with open(args.output, 'w') as f:
+        json.dump(document, f, indent=2)
+    print(f"Results written to {args.output}")
+    engine_speedups(document)
@@ -0,0 +1,103 @@
+import functools
+import hashlib
+import json
+import os
+import shutil
+
+import numpy as np
+
+# Total size the cache may grow to before the least recently used entries are dropped
+DEFAULT_MAX_BYTES = 2 ** 30
+
+
+# Hash of the package's source files. It is part of every key, so an edit to the
+# simulation code never serves results computed by the old code.
+@functools.lru_cache(maxsize=None)
+def code_version():
+    digest = hashlib.sha256()
+    package = os.path.dirname(os.path.abspath(__file__))
+    for name in sorted(os.listdir(package)):
+        if name.endswith('.py'):
+            digest.update(name.encode())
+            with open(os.path.join(package, name), 'rb') as f:
+                digest.update(f.read())
+    return digest.hexdigest()[:16]
+
+
+# Column as an array np.load can read back without pickling; object columns (names,
+# user types) are stored as strings
+def plain_array(column):
+    column = np.asarray(column)
+    return column.astype(str) if column.dtype == object else column
+
+
+# Content-addressed store of finished runs on disk. Each entry is a directory named by
+# the hash of the run configuration (variant, parameters, seed) and the code version,
+# holding the final user/post columns, the error metrics, the per-type action tallies
+# and the rendered figures.
+# An entry's directory mtime marks when it was last used; once the cache is over
+# max_bytes, the least recently used entries are removed.
+class ResultCache:
+    def __init__(self, directory, max_bytes=DEFAULT_MAX_BYTES):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        os.makedirs(directory, exist_ok=True)
+
+    def key(self, config):
+        canonical = json.dumps(dict(config, code_version=code_version()), sort_keys=True, separators=(',', ':'))
+        return hashlib.sha256(canonical.encode()).hexdigest()[:32]
+
+    # The cached result of config as {'users', 'posts', 'metrics', 'tallies', 'figures'},
+    # or None. users / posts map column names to arrays; tallies is keyed like
+    # SimulationArrays.action_tallies; figures lists the cached image paths.
+    def get(self, config):
+        entry = os.path.join(self.directory, self.key(config))
+        if not os.path.isdir(entry):
+            return None
+        os.utime(entry)
+        with np.load(os.path.join(entry, 'users.npz')) as data:
+            users = {name: data[name] for name in data.files}
+        with np.load(os.path.join(entry, 'posts.npz')) as data:
+            posts = {name: data[name] for name in data.files}
+        with open(os.path.join(entry, 'metrics.json')) as f:
+            stored = json.load(f)
+        figures = sorted(os.path.join(entry, 'figures', name) for name in os.listdir(os.path.join(entry, 'figures')))
+        return {'users': users, 'posts': posts, 'metrics': stored['metrics'], 'tallies': stored.get('tallies'),
+                'figures': figures}
+
+    # Store a finished run. The entry is assembled under a temporary name and renamed
+    # into place, so readers never see half an entry.
+    def put(self, config, users, posts, metrics, figures=(), tallies=None):
+        key = self.key(config)
+        entry = os.path.join(self.directory, key)
+        tmp_entry = os.path.join(self.directory, f".tmp-{key}-{os.getpid()}")
+        os.makedirs(os.path.join(tmp_entry, 'figures'))
+        np.savez(os.path.join(tmp_entry, 'users.npz'), **{name: plain_array(column) for name, column in users.items()})
+        np.savez(os.path.join(tmp_entry, 'posts.npz'), **{name: plain_array(column) for name, column in posts.items()})
+        with open(os.path.join(tmp_entry, 'metrics.json'), 'w') as f:
+            json.dump({'metrics': metrics, 'tallies': tallies, 'config': config}, f, indent=2)
+        for path in figures:
+            shutil.copy(path, os.path.join(tmp_entry, 'figures'))
+        try:
+            os.replace(tmp_entry, entry)
+        except OSError:
+            # Another process stored the same result first
+            shutil.rmtree(tmp_entry, ignore_errors=True)
+        self.evict()
+
+    # Drop least recently used entries until the cache fits in max_bytes
+    def evict(self):
+        entries = []
+        for name in os.listdir(self.directory):
+            entry = os.path.join(self.directory, name)
+            if name.startswith('.tmp-') or not os.path.isdir(entry):
+                continue
+            size = sum(os.path.getsize(os.path.join(root, file))
+                       for root, _, files in os.walk(entry) for file in files)
+            entries.append((os.path.getmtime(entry), size, entry))
+        total = sum(size for _, size, _ in entries)
+        for _, size, entry in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            shutil.rmtree(entry, ignore_errors=True)
+            total -= size
@@ -0,0 +1,38 @@
+import json
+import os
+
+import numpy as np
+
+
+# Save the state of a run in progress to an .npz file: every array column of sim, the
+# index of the next user to run, the generator state and the run configuration. The
+# file is written under a temporary name and renamed into place, so a crash while
+# saving leaves the previous checkpoint intact.
+def save_checkpoint(path, sim, next_user, rng, config):
+    arrays = {name: value for name, value in vars(sim).items() if isinstance(value, np.ndarray)}
+    meta = {'next_user': next_user, 'rng_state': rng.bit_generator.state, 'config': config}
+    tmp_path = f"{path}.tmp{os.getpid()}"
+    with open(tmp_path, 'wb') as f:
+        np.savez(f, _meta=np.array(json.dumps(meta)), **arrays)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+
+
+# Restore a checkpoint into sim, which must have been built with the same sizes.
+# Returns the index of the next user to run and a generator positioned where the
+# saved run stopped. Raises ValueError if the checkpoint was written for another
+# configuration, since resuming it would silently mix two runs.
+def load_checkpoint(path, sim, config):
+    with np.load(path) as data:
+        meta = json.loads(data['_meta'].item())
+        if meta['config'] != json.loads(json.dumps(config)):
+            raise ValueError(f"Checkpoint {path} was written for a different configuration: {meta['config']}")
+        for name in data.files:
+            if name != '_meta':
+                setattr(sim, name, data[name])
+    sim.refresh_corners()
+    state = meta['rng_state']
+    rng = np.random.Generator(getattr(np.random, state['bit_generator'])())
+    rng.bit_generator.state = state
+    return meta['next_user'], rng
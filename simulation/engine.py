@@ -0,0 +1,616 @@
+import os
+from collections import deque
+
+import numpy as np
+
+from .checkpoint import load_checkpoint, save_checkpoint
+from .instrumentation import NULL_TIMER
+from .population import generate_posts, generate_users, split_distributions, user_name
+from .ranking import get_ranking, ranked_feeds
+from .spatial import PostGrid
+from .strategies import ACTIONS, BEHAVIORS, DISLIKE, LIKE, NONE, USER_TYPES, get_model, get_update_rule, in_corner
+
+# Posts checked one by one after a like before switching to array windows,
+# and the size of the first such window
+SCAN_LENGTH = 32
+MIN_WINDOW = 64
+
+
+# Array-backed simulation state: one entry per user / post instead of one object each
+class SimulationArrays:
+    def __init__(self, num_users, num_posts, update_rule='average', pull_strength=0.1, history_size=0):
+        self.update_rule = get_update_rule(update_rule, pull_strength)  # Strategy object from strategies.py
+        self.history_size = history_size  # Liked coordinates kept per user in a ring buffer (0 disables)
+        self.events = None  # EventLog that likes and dislikes are written to, if any
+        self.metrics = None  # metrics.ErrorMetrics kept up to date after every pass, if any
+
+        # User columns
+        self.user_id = np.arange(1, num_users + 1)
+        self.user_quality = np.zeros(num_users)
+        self.user_x = np.zeros(num_users)
+        self.user_y = np.zeros(num_users)
+        self.user_experiment_x = np.zeros(num_users)
+        self.user_experiment_y = np.zeros(num_users)
+        self.user_experiment_quality = np.full(num_users, 5000.0)
+        self.user_type = np.zeros(num_users, dtype=np.int8)
+        self.liked_sum_x = np.zeros(num_users)
+        self.liked_sum_y = np.zeros(num_users)
+        self.num_liked = np.zeros(num_users, dtype=np.int64)
+        # Ring buffer of the most recent liked (x, y); slot num_liked % history_size is written next
+        self.liked_history = np.zeros((num_users, history_size, 2))
+
+        # Post columns
+        self.post_id = np.arange(1, num_posts + 1)
+        self.post_user_id = np.zeros(num_posts, dtype=np.int64)
+        self.post_quality = np.zeros(num_posts)
+        self.post_x = np.zeros(num_posts)
+        self.post_y = np.zeros(num_posts)
+        self.post_experiment_x = np.zeros(num_posts)
+        self.post_experiment_y = np.zeros(num_posts)
+        self.post_experiment_quality = np.full(num_posts, 5000.0)
+        self.likes = np.zeros(num_posts, dtype=np.int64)
+        self.dislikes = np.zeros(num_posts, dtype=np.int64)
+        self.total_likers_x = np.zeros(num_posts)
+        self.total_likers_y = np.zeros(num_posts)
+        # Indices of the posts currently in a corner; kept up to date as likes move posts,
+        # but only while track_corners is set (see refresh_corners)
+        self.corner_posts = set()
+        self.track_corners = False
+
+        # Applied actions per user type, indexed [type code, LIKE/DISLIKE/NONE]
+        self.action_counts = np.zeros((len(USER_TYPES), len(ACTIONS)), dtype=np.int64)
+
+    @property
+    def num_users(self):
+        return len(self.user_id)
+
+    @property
+    def num_posts(self):
+        return len(self.post_id)
+
+    @property
+    def interaction_count(self):
+        return int(self.action_counts[:, LIKE].sum() + self.action_counts[:, DISLIKE].sum())
+
+    @property
+    def total_interactions(self):
+        return int(self.action_counts.sum())
+
+    @property
+    def interaction_rate(self):
+        return self.interaction_count / self.total_interactions if self.total_interactions else 0.0
+
+    # Per-type action counts keyed by name, in the form run_simulation reports them
+    def action_tallies(self):
+        tallies = {}
+        for code, user_type in enumerate(USER_TYPES):
+            if self.action_counts[code].any():
+                tallies[user_type] = {action: int(n) for action, n in zip(ACTIONS, self.action_counts[code])}
+        return tallies
+
+    # Liked coordinates still in user i's ring buffer, oldest first
+    def recent_likes(self, i):
+        count = int(self.num_liked[i])
+        if count <= self.history_size:
+            return self.liked_history[i, :count]
+        return np.roll(self.liked_history[i], -(count % self.history_size), axis=0)
+
+    # Rebuild the corner set from the post columns, after they were filled or loaded.
+    # Only corner-only users read it, so without any it is left empty and not tracked.
+    def refresh_corners(self):
+        self.track_corners = any(BEHAVIORS[code].corner_only for code in np.unique(self.user_type).tolist())
+        if self.track_corners:
+            corner = in_corner(self.post_experiment_x, self.post_experiment_y)
+            self.corner_posts = set(np.flatnonzero(corner).tolist())
+        else:
+            self.corner_posts = set()
+
+    # Columns named like the User attributes, for building a DataFrame without objects
+    def user_columns(self, fields):
+        columns = {
+            'user_id': self.user_id,
+            'name': [user_name(user_id) for user_id in self.user_id.tolist()],
+            'quality': self.user_quality,
+            'x': self.user_x,
+            'y': self.user_y,
+            'experiment_x': self.user_experiment_x,
+            'experiment_y': self.user_experiment_y,
+            'experiment_quality': self.user_experiment_quality,
+            'user_type': np.array(USER_TYPES)[self.user_type],
+            'liked_sum_x': self.liked_sum_x,
+            'liked_sum_y': self.liked_sum_y,
+            'num_liked': self.num_liked,
+            'liked_history': [deque(map(tuple, self.recent_likes(i).tolist()), maxlen=self.history_size)
+                              if self.history_size else None for i in range(self.num_users)],
+        }
+        return {field: columns[field] for field in fields}
+
+    # Columns named like the Post attributes, for building a DataFrame without objects
+    def post_columns(self, fields):
+        columns = {
+            'post_id': self.post_id,
+            'user_id': self.post_user_id,
+            'quality': self.post_quality,
+            'x': self.post_x,
+            'y': self.post_y,
+            'experiment_x': self.post_experiment_x,
+            'experiment_y': self.post_experiment_y,
+            'experiment_quality': self.post_experiment_quality,
+            'likes': self.likes,
+            'dislikes': self.dislikes,
+            'total_likers_x': self.total_likers_x,
+            'total_likers_y': self.total_likers_y,
+        }
+        return {field: columns[field] for field in fields}
+
+    # Rebuild User/Post objects for code that works on the object API
+    def to_objects(self, user_cls, post_cls):
+        users = []
+        for i in range(self.num_users):
+            user = user_cls(int(self.user_id[i]), user_name(int(self.user_id[i])), float(self.user_quality[i]),
+                            float(self.user_x[i]), float(self.user_y[i]), USER_TYPES[self.user_type[i]],
+                            experiment_x=float(self.user_experiment_x[i]),
+                            experiment_y=float(self.user_experiment_y[i]))
+            user.experiment_quality = float(self.user_experiment_quality[i])
+            user.liked_sum_x = float(self.liked_sum_x[i])
+            user.liked_sum_y = float(self.liked_sum_y[i])
+            user.num_liked = int(self.num_liked[i])
+            if self.history_size:
+                user.liked_history = deque(map(tuple, self.recent_likes(i).tolist()), maxlen=self.history_size)
+            users.append(user)
+
+        posts = []
+        for j in range(self.num_posts):
+            post = post_cls(int(self.post_id[j]), int(self.post_user_id[j]), float(self.post_quality[j]),
+                            float(self.post_x[j]), float(self.post_y[j]))
+            post.experiment_x = float(self.post_experiment_x[j])
+            post.experiment_y = float(self.post_experiment_y[j])
+            post.experiment_quality = float(self.post_experiment_quality[j])
+            post.likes = int(self.likes[j])
+            post.dislikes = int(self.dislikes[j])
+            post.total_likers_x = float(self.total_likers_x[j])
+            post.total_likers_y = float(self.total_likers_y[j])
+            posts.append(post)
+        return users, posts
+
+
+# Print tallies as SimulationArrays.action_tallies gives them: the overall interaction rate
+# and the like/dislike rates for each user type
+def print_interaction_summary(tallies):
+    total = sum(sum(counts.values()) for counts in tallies.values())
+    interactions = sum(counts['like'] + counts['dislike'] for counts in tallies.values())
+    print(f"Interaction Rate: {interactions / total:.2%}")
+    for user_type, counts in tallies.items():
+        seen = sum(counts.values())
+        print(f"  {user_type}: Likes {counts['like'] / seen:.2%}, Dislikes {counts['dislike'] / seen:.2%}")
+
+
+# Fill the user and post columns from population.generate_users / generate_posts, the
+# same arrays create_users / create_posts build their objects from, so both engines
+# build the same population from the same Generator. distributions replaces the
+# distributions of some attributes (see population.py). Posts are created user by
+# user, num_posts_per_user each; when there is room for more (a round run) the same
+# order repeats once per round.
+def populate(sim, num_posts_per_user, model, rng, distributions=None):
+    users, posts = split_distributions(distributions)
+    columns = generate_users(sim.num_users, model, rng, users)
+    sim.user_quality[:] = columns['quality']
+    sim.user_x[:] = columns['x']
+    sim.user_y[:] = columns['y']
+    sim.user_type[:] = columns['user_type']
+    sim.user_experiment_x[:] = columns['experiment_x']
+    sim.user_experiment_y[:] = columns['experiment_y']
+
+    columns = generate_posts(sim.user_id, num_posts_per_user, rng, posts, sim.num_posts)
+    sim.post_user_id[:] = columns['user_id']
+    sim.post_quality[:] = columns['quality']
+    sim.post_x[:] = sim.post_experiment_x[:] = columns['x']
+    sim.post_y[:] = sim.post_experiment_y[:] = columns['y']
+    sim.refresh_corners()
+
+
+# Apply a like from user i to post j; mirrors Post.interact. The update rule moves
+# the post and user; the user's coordinates are passed in and returned so a pass
+# can keep them in local floats.
+def apply_like(sim, i, j, ux, uy, distance):
+    events = sim.events
+    if events is not None:
+        before = (ux, uy, sim.post_experiment_x.item(j), sim.post_experiment_y.item(j),
+                  sim.post_experiment_quality.item(j))
+    sim.likes[j] = sim.likes.item(j) + 1
+    ux, uy = sim.update_rule.move_arrays(sim, i, j, ux, uy)
+    # Only a like moves a post, so this is the one place the corner set can change
+    if sim.track_corners:
+        if in_corner(sim.post_experiment_x.item(j), sim.post_experiment_y.item(j)):
+            sim.corner_posts.add(j)
+        else:
+            sim.corner_posts.discard(j)
+    quality_boost = (1 - distance / 10) * sim.user_experiment_quality.item(i) / 10000
+    sim.post_experiment_quality[j] = min(10000, sim.post_experiment_quality.item(j) + quality_boost * 100)
+    if events is not None:
+        user_x, user_y, post_x, post_y, quality = before
+        events.record(LIKE, sim.user_id.item(i), sim.post_id.item(j), distance, user_x, user_y, ux, uy, post_x,
+                      post_y, sim.post_experiment_x.item(j), sim.post_experiment_y.item(j), quality,
+                      sim.post_experiment_quality.item(j))
+    return ux, uy
+
+
+# Bring sim.metrics up to date for user i and the posts a pass changed
+def track_errors(sim, i, posts):
+    sim.metrics.set_users(i, sim.user_x.item(i), sim.user_y.item(i), sim.user_experiment_x.item(i),
+                          sim.user_experiment_y.item(i))
+    sim.metrics.set_posts(posts, sim.post_quality[posts], sim.post_x[posts], sim.post_y[posts],
+                          sim.post_experiment_x[posts], sim.post_experiment_y[posts],
+                          sim.post_experiment_quality[posts])
+
+
+# First post at or after start that a user at (ux, uy) likes, searched in doubling
+# windows so long runs without a like cost a few array operations, not a Python loop.
+# Returns (index, squared distance), or (len(posts), 0.0) when nothing is liked.
+def next_like(ux, uy, post_ex, post_ey, radius_sq, start):
+    num_posts = len(post_ex)
+    window = MIN_WINDOW
+    while start < num_posts:
+        end = min(num_posts, start + window)
+        dx = ux - post_ex[start:end]
+        dy = uy - post_ey[start:end]
+        dist_sq = dx * dx + dy * dy
+        like = dist_sq < radius_sq[start:end]
+        k = int(like.argmax())
+        if like[k]:
+            return start + k, float(dist_sq[k])
+        start = end
+        window *= 2
+    return num_posts, 0.0
+
+
+# Pass-local copy of what the likes of one user_pass read and write: the pass's post
+# columns as Python lists and the user's liked sums as floats. Scalar access to a list
+# is several times cheaper than to an ndarray, and each post is liked at most once per
+# pass, so the likes run on this copy (the update rules' move_local) and commit writes
+# the liked posts back with fancy indexing once the pass is done. The corner set and
+# the event log are brought up to date there too, not once per like.
+class PassState:
+    def __init__(self, sim, i, start, end):
+        self.i = i
+        self.rule = sim.update_rule
+        self.user_quality = sim.user_experiment_quality.item(i)
+        self.post_x = sim.post_experiment_x[start:end].tolist()
+        self.post_y = sim.post_experiment_y[start:end].tolist()
+        self.quality = sim.post_experiment_quality[start:end].tolist()
+        self.likes = sim.likes[start:end].tolist()
+        self.total_x = sim.total_likers_x[start:end].tolist()
+        self.total_y = sim.total_likers_y[start:end].tolist()
+        self.num_liked = sim.num_liked.item(i)
+        self.liked_sum_x = sim.liked_sum_x.item(i)
+        self.liked_sum_y = sim.liked_sum_y.item(i)
+        self.history = [] if sim.history_size else None  # Liked (x, y) in order, when kept
+        self.liked = []  # Indices into the pass of the liked posts, in order
+        self.distances = []  # Distance to each liked post when it was liked
+
+    # Like of post j at the given distance; mirrors apply_like
+    def like(self, j, ux, uy, distance):
+        self.likes[j] += 1
+        ux, uy = self.rule.move_local(self, j, ux, uy)
+        quality_boost = (1 - distance / 10) * self.user_quality / 10000
+        quality = self.quality[j] + quality_boost * 100
+        self.quality[j] = 10000 if quality > 10000 else quality
+        self.liked.append(j)
+        self.distances.append(distance)
+        return ux, uy
+
+    # Write the liked posts and the user's sums back to sim. seg_x / seg_y are the
+    # user's positions before the first like and after each one. Returns the FIELDS
+    # columns of the like events (see events.py) when sim keeps an event log.
+    def commit(self, sim, start, seg_x, seg_y):
+        liked = self.liked
+        posts = start + np.array(liked, dtype=np.int64)
+        if sim.events is not None:
+            before = (sim.post_experiment_x[posts], sim.post_experiment_y[posts],
+                      sim.post_experiment_quality[posts])
+        for column, values in ((sim.post_experiment_x, self.post_x), (sim.post_experiment_y, self.post_y),
+                               (sim.post_experiment_quality, self.quality), (sim.likes, self.likes),
+                               (sim.total_likers_x, self.total_x), (sim.total_likers_y, self.total_y)):
+            column[posts] = [values[j] for j in liked]
+        i = self.i
+        if self.history:
+            recent = self.history[-sim.history_size:]
+            slots = np.arange(self.num_liked - len(recent), self.num_liked) % sim.history_size
+            sim.liked_history[i, slots] = recent
+        sim.num_liked[i] = self.num_liked
+        sim.liked_sum_x[i] = self.liked_sum_x
+        sim.liked_sum_y[i] = self.liked_sum_y
+        # Only a like moves a post, so the liked posts are the only ones whose corner can change
+        if sim.track_corners:
+            corner = in_corner(sim.post_experiment_x[posts], sim.post_experiment_y[posts])
+            sim.corner_posts.update(posts[corner].tolist())
+            sim.corner_posts.difference_update(posts[~corner].tolist())
+        if sim.events is None:
+            return None
+        post_x, post_y, quality = before
+        return dict(user_id=sim.user_id.item(i), post_id=sim.post_id[posts], distance=np.array(self.distances),
+                    user_x_before=np.array(seg_x[:-1]), user_y_before=np.array(seg_y[:-1]),
+                    user_x_after=np.array(seg_x[1:]), user_y_after=np.array(seg_y[1:]), post_x_before=post_x,
+                    post_y_before=post_y, post_x_after=sim.post_experiment_x[posts],
+                    post_y_after=sim.post_experiment_y[posts], quality_before=quality,
+                    quality_after=sim.post_experiment_quality[posts])
+
+
+# Write the likes and dislikes of one pass to the log as a single batch in the order the
+# posts were seen. liked_at and hits are the positions in the pass of the liked and the
+# disliked posts, and likes / dislikes their event columns, each already in post order.
+def record_pass(events, liked_at, likes, hits, dislikes):
+    if dislikes is None or not hits.size:
+        events.record_batch(LIKE, len(liked_at), **likes)
+        return
+    order = np.argsort(np.concatenate([np.array(liked_at, dtype=np.int64), hits]), kind='stable')
+    actions = np.repeat(np.array([LIKE, DISLIKE], dtype=np.int8), [len(liked_at), hits.size])
+    columns = {name: np.concatenate([np.broadcast_to(likes[name], len(liked_at)),
+                                     np.broadcast_to(dislikes[name], hits.size)])[order] for name in likes}
+    events.record_batch(actions[order], len(order), **columns)
+
+
+# One user's pass over every post. A like moves the user and changes every later
+# distance, so likes are found one at a time: the like test is a per-post radius
+# computed for the whole pass in one batch, checked against the user's current
+# position. The likes themselves are applied to a PassState and written back at the
+# end. Dislikes only lower the quality of the post itself, which nothing later in the
+# pass reads, so they are decided and applied in one batch at the end using the user
+# position that was current at each post. Posts ahead of the cursor are never touched
+# during the pass, so this reproduces the sequential semantics exactly.
+# The pass covers the len(draws) posts from index start on, every post by default.
+def user_pass(sim, i, draws, start=0):
+    num_posts = len(draws)
+    end = start + num_posts
+    user_type = sim.user_type[i]
+    behavior = BEHAVIORS[user_type]
+    ux = sim.user_experiment_x.item(i)
+    uy = sim.user_experiment_y.item(i)
+    # Views of the posts in the pass; j below indexes into them
+    post_ex = sim.post_experiment_x[start:end]
+    post_ey = sim.post_experiment_y[start:end]
+    post_eq = sim.post_experiment_quality[start:end]
+    quality_factor = post_eq / 10000
+    radius_sq = behavior.like_radius_sq(quality_factor, draws, post_ex, post_ey)
+
+    state = PassState(sim, i, start, end)
+    seg_x = [ux]
+    seg_y = [uy]
+    if behavior.position_independent:
+        # Likes do not depend on the user's position, so their order is known up front
+        liked = np.flatnonzero(radius_sq > 0)
+        for j, px, py in zip(liked.tolist(), post_ex[liked].tolist(), post_ey[liked].tolist()):
+            distance = ((ux - px) ** 2 + (uy - py) ** 2) ** 0.5
+            ux, uy = state.like(j, ux, uy, distance)
+            seg_x.append(ux)
+            seg_y.append(uy)
+    else:
+        # The posts ahead of j are only read; a like changes post j alone
+        pex = state.post_x
+        pey = state.post_y
+        rsq = radius_sq.tolist()
+        j = 0
+        while j < num_posts:
+            # Likes are usually a few posts apart, so scan the next few in plain Python
+            # before falling back to the array search
+            stop = min(num_posts, j + SCAN_LENGTH)
+            while j < stop:
+                dx = ux - pex[j]
+                dy = uy - pey[j]
+                dist_sq = dx * dx + dy * dy
+                if dist_sq < rsq[j]:
+                    break
+                j += 1
+            else:
+                j, dist_sq = next_like(ux, uy, post_ex, post_ey, radius_sq, j)
+                if j == num_posts:
+                    break
+            ux, uy = state.like(j, ux, uy, dist_sq ** 0.5)
+            seg_x.append(ux)
+            seg_y.append(uy)
+            j += 1
+    liked_at = state.liked
+    like_events = state.commit(sim, start, seg_x, seg_y)
+
+    num_dislikes = 0
+    hits = np.zeros(0, dtype=np.int64)
+    dislike_events = None
+    if behavior.can_dislike:
+        # Position of the user when each post was seen: the one set by the last like before it
+        segment = np.searchsorted(np.array(liked_at, dtype=np.int64), np.arange(num_posts), side='right')
+        distance = np.sqrt((np.array(seg_x)[segment] - post_ex) ** 2 + (np.array(seg_y)[segment] - post_ey) ** 2)
+        dislike = behavior.dislikes(distance, quality_factor, draws)
+        dislike[liked_at] = False
+        hits = np.flatnonzero(dislike)
+        quality_drop = (1 - distance[hits] / 10) * sim.user_experiment_quality[i] / 10000
+        quality_before = post_eq[hits]
+        post_eq[hits] = np.maximum(0, quality_before - quality_drop * 100)
+        if sim.events is not None:
+            # A dislike moves neither side, so positions are the same before and after
+            user_x = np.array(seg_x)[segment[hits]]
+            user_y = np.array(seg_y)[segment[hits]]
+            dislike_events = dict(
+                user_id=sim.user_id.item(i), post_id=sim.post_id[start + hits], distance=distance[hits],
+                user_x_before=user_x, user_y_before=user_y, user_x_after=user_x, user_y_after=user_y,
+                post_x_before=post_ex[hits], post_y_before=post_ey[hits], post_x_after=post_ex[hits],
+                post_y_after=post_ey[hits], quality_before=quality_before, quality_after=post_eq[hits])
+        sim.dislikes[start + hits] += 1
+        num_dislikes = hits.size
+
+    sim.user_experiment_x[i] = ux
+    sim.user_experiment_y[i] = uy
+    counts = sim.action_counts[user_type]
+    counts[LIKE] += len(liked_at)
+    counts[DISLIKE] += num_dislikes
+    counts[NONE] += num_posts - len(liked_at) - num_dislikes
+    if sim.events is not None:
+        record_pass(sim.events, liked_at, like_events, hits, dislike_events)
+    if sim.metrics is not None:
+        track_errors(sim, i, start + np.concatenate([np.array(liked_at, dtype=np.int64), hits]))
+
+
+# Pass of a corner-only user (see UserBehavior.corner_only): every corner post is liked
+# in post order and every other post is ignored, so only the corner set is visited.
+# A like moves only the post just liked, so the snapshot of the set stays valid.
+# Like user_pass, the pass can be limited to the num_posts posts from start on. The
+# corner posts of such a window are found by checking the window's posts in one batch,
+# not by filtering the set, whose size grows with every round of a round run.
+def corner_pass(sim, i, start=0, num_posts=None):
+    if num_posts is None:
+        num_posts = sim.num_posts - start
+    ux = sim.user_experiment_x.item(i)
+    uy = sim.user_experiment_y.item(i)
+    if start == 0 and num_posts == sim.num_posts:
+        liked = sorted(sim.corner_posts)
+    else:
+        end = start + num_posts
+        corner = in_corner(sim.post_experiment_x[start:end], sim.post_experiment_y[start:end])
+        liked = (start + np.flatnonzero(corner)).tolist()
+    for j in liked:
+        distance = ((ux - sim.post_experiment_x.item(j)) ** 2 + (uy - sim.post_experiment_y.item(j)) ** 2) ** 0.5
+        ux, uy = apply_like(sim, i, j, ux, uy, distance)
+    sim.user_experiment_x[i] = ux
+    sim.user_experiment_y[i] = uy
+    counts = sim.action_counts[sim.user_type[i]]
+    counts[LIKE] += len(liked)
+    counts[NONE] += num_posts - len(liked)
+    if sim.metrics is not None:
+        track_errors(sim, i, np.array(liked, dtype=np.int64))
+
+
+# User i's pass over a feed of post indices, one post at a time as Post.interact does.
+# Feeds are short, so there is nothing to gain from batching; liked posts are re-filed
+# in the grid, if one is given, as they move.
+def feed_pass(sim, i, feed, draws, grid=None):
+    user_type = sim.user_type[i]
+    behavior = BEHAVIORS[user_type]
+    counts = sim.action_counts[user_type]
+    user_quality = sim.user_experiment_quality.item(i)
+    ux = sim.user_experiment_x.item(i)
+    uy = sim.user_experiment_y.item(i)
+    touched = []
+    for j, draw in zip(feed.tolist(), draws.tolist()):
+        px = sim.post_experiment_x.item(j)
+        py = sim.post_experiment_y.item(j)
+        distance = ((ux - px) ** 2 + (uy - py) ** 2) ** 0.5
+        action = behavior.decide(distance, sim.post_experiment_quality.item(j) / 10000, draw, px, py)
+        if action == LIKE:
+            ux, uy = apply_like(sim, i, j, ux, uy, distance)
+            if grid is not None:
+                grid.move(j)
+        elif action == DISLIKE:
+            sim.dislikes[j] += 1
+            quality_drop = (1 - distance / 10) * user_quality / 10000
+            quality = sim.post_experiment_quality.item(j)
+            sim.post_experiment_quality[j] = max(0, quality - quality_drop * 100)
+            if sim.events is not None:
+                sim.events.record(DISLIKE, sim.user_id.item(i), sim.post_id.item(j), distance, ux, uy, ux, uy, px,
+                                  py, px, py, quality, sim.post_experiment_quality.item(j))
+        if action != NONE:
+            touched.append(j)
+        counts[action] += 1
+    sim.user_experiment_x[i] = ux
+    sim.user_experiment_y[i] = uy
+    if sim.metrics is not None:
+        track_errors(sim, i, np.array(touched, dtype=np.int64))
+
+
+# Posts user i sees in neighbourhood mode: those within feed_radius of the user's
+# current position, thinned to a random feed_size of them when there are more
+def neighborhood_feed(sim, i, grid, feed_radius, feed_size, rng):
+    feed = grid.query(sim.user_experiment_x.item(i), sim.user_experiment_y.item(i), feed_radius)
+    if feed_size is not None and len(feed) > feed_size:
+        feed = np.sort(rng.choice(feed, feed_size, replace=False))
+    return feed
+
+
+# Run the whole simulation on arrays and return the final state.
+# With feed_radius set, each user only sees the posts near them (see neighborhood_feed)
+# instead of every post, found through a grid index over post positions.
+# With feed_rank set to a ranking policy (see ranking.py), each user instead sees the
+# feed_size posts it ranks highest, best first. Users are scored rank_batch at a time
+# against the state at the start of their batch; 1 scores each user as it comes up.
+# Pass an events.EventLog as events to record every like and dislike; the caller closes it.
+# Pass a metrics.ErrorMetrics as metrics to have the error metrics kept up to date.
+# distributions replaces how some population attributes are drawn (see populate).
+# With checkpoint set to a file path the state is saved there every checkpoint_every
+# users, and a run started with an existing checkpoint picks up where it stopped; the
+# result is identical to an uninterrupted run. Events are only logged for the users run
+# in this call.
+def simulate(num_users, num_posts_per_user, model='classic', update_rule='average', pull_strength=0.1,
+             type_weights=None, history_size=0, rng=None, timer=NULL_TIMER, feed_radius=None, feed_size=None,
+             events=None, checkpoint=None, checkpoint_every=1000, metrics=None, feed_rank=None, rank_batch=1,
+             distributions=None):
+    if feed_rank is not None:
+        if feed_radius is not None:
+            raise ValueError("A feed is either ranked or limited to a radius, not both")
+        if feed_size is None:
+            raise ValueError("A ranked feed needs a feed_size")
+        if checkpoint is not None and checkpoint_every % rank_batch:
+            raise ValueError("checkpoint_every must be a multiple of rank_batch to resume a ranked feed")
+        ranking = get_ranking(feed_rank)
+    if rng is None:
+        rng = np.random.default_rng()
+    config = {
+        'num_users': num_users, 'num_posts_per_user': num_posts_per_user,
+        'model': model if isinstance(model, str) else model.name,
+        'update_rule': update_rule if isinstance(update_rule, str) else update_rule.name,
+        'pull_strength': pull_strength, 'type_weights': type_weights, 'history_size': history_size,
+        'feed_radius': feed_radius, 'feed_size': feed_size,
+        'feed_rank': feed_rank if feed_rank is None or isinstance(feed_rank, str) else feed_rank.name,
+        'rank_batch': rank_batch,
+        'distributions': {name: repr(distribution) for name, distribution in sorted((distributions or {}).items())},
+    }
+    start = 0
+    with timer.stage('create_population'):
+        sim = SimulationArrays(num_users, num_users * num_posts_per_user, update_rule, pull_strength, history_size)
+        if checkpoint is not None and os.path.exists(checkpoint):
+            start, rng = load_checkpoint(checkpoint, sim, config)
+        else:
+            populate(sim, num_posts_per_user, get_model(model, type_weights), rng, distributions)
+    sim.events = events
+    sim.metrics = metrics
+    if metrics is not None:
+        metrics.set_arrays(sim)
+    with timer.stage('interactions'):
+        if feed_radius is not None:
+            grid = PostGrid(sim.post_experiment_x, sim.post_experiment_y, cell_size=feed_radius)
+        for i in range(start, num_users):
+            if feed_radius is not None:
+                feed = neighborhood_feed(sim, i, grid, feed_radius, feed_size, rng)
+                feed_pass(sim, i, feed, rng.random(len(feed)), grid)
+            elif feed_rank is not None:
+                if i == start or i % rank_batch == 0:
+                    first = i
+                    feeds = ranked_feeds(sim, np.arange(i, min(num_users, i - i % rank_batch + rank_batch)),
+                                         feed_size, ranking)
+                feed = feeds[i - first]
+                feed_pass(sim, i, feed, rng.random(len(feed)))
+            elif BEHAVIORS[sim.user_type[i]].corner_only:
+                # Corner-only users never use a draw, so none are taken for them
+                corner_pass(sim, i)
+            else:
+                # One uniform draw per user/post pair, drawn as a block for the whole pass
+                user_pass(sim, i, rng.random(sim.num_posts))
+            if checkpoint is not None and (i + 1) % checkpoint_every == 0:
+                save_checkpoint(checkpoint, sim, i + 1, rng, config)
+    if checkpoint is not None and start < num_users:
+        save_checkpoint(checkpoint, sim, num_users, rng, config)
+    return sim
+
+
+# Root-mean-square gap between actual and experimental values, as reported by test_simulation,
+# computed from the columns in one go (metrics.ErrorMetrics keeps them up to date instead).
+# num_posts limits the post metrics to the first posts, e.g. those created so far in a round run.
+def error_metrics(sim, num_posts=None):
+    def rmse(actual, experimental):
+        return float(np.sqrt(np.mean((actual - experimental) ** 2)))
+
+    posts = slice(num_posts)
+    return {
+        'User X': rmse(sim.user_x, sim.user_experiment_x),
+        'User Y': rmse(sim.user_y, sim.user_experiment_y),
+        'Post X': rmse(sim.post_x[posts], sim.post_experiment_x[posts]),
+        'Post Y': rmse(sim.post_y[posts], sim.post_experiment_y[posts]),
+        'Quality': rmse(sim.post_quality[posts] * 10000, sim.post_experiment_quality[posts]),
+    }
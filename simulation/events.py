@@ -0,0 +1,121 @@
+import os
+
+import numpy as np
+
+from .strategies import ACTIONS, NONE
+
+# Columns of the event log besides the action. "before" values are read just ahead of
+# the interaction and "after" values once it has been applied.
+FIELDS = {
+    'user_id': np.int64,
+    'post_id': np.int64,
+    'distance': np.float64,
+    'user_x_before': np.float64,
+    'user_y_before': np.float64,
+    'user_x_after': np.float64,
+    'user_y_after': np.float64,
+    'post_x_before': np.float64,
+    'post_y_before': np.float64,
+    'post_x_after': np.float64,
+    'post_y_after': np.float64,
+    'quality_before': np.float64,
+    'quality_after': np.float64,
+}
+
+# Rows buffered before a batch is written out
+BATCH_SIZE = 65536
+
+
+# Streams every like and dislike to a Parquet or Arrow IPC file. Events are buffered in
+# preallocated columns of batch_size rows and written out as one record batch whenever
+# the buffer fills, so memory stays bounded however long the run is. pyarrow is only
+# needed once a log is opened.
+# Events are recorded in the order the interactions happened, and the log numbers them
+# in that order from 0 in its sequence column, so the order survives filtering the file
+# or reading it back in pieces.
+class EventLog:
+    def __init__(self, path, batch_size=BATCH_SIZE, file_format=None):
+        import pyarrow as pa
+
+        self.pa = pa
+        self.path = path
+        self.batch_size = batch_size
+        # Parquet unless the extension says Arrow IPC
+        self.file_format = file_format or ('arrow' if os.path.splitext(path)[1] in ('.arrow', '.feather') else 'parquet')
+        self.schema = pa.schema([('action', pa.dictionary(pa.int8(), pa.string())), ('sequence', pa.int64())]
+                                + [(name, pa.from_numpy_dtype(dtype)) for name, dtype in FIELDS.items()])
+        self.action_names = pa.array(ACTIONS)
+        self.actions = np.zeros(batch_size, dtype=np.int8)
+        self.sequence = np.zeros(batch_size, dtype=np.int64)
+        self.columns = {name: np.zeros(batch_size, dtype=dtype) for name, dtype in FIELDS.items()}
+        self.size = 0
+        self.num_events = 0
+        if self.file_format == 'parquet':
+            import pyarrow.parquet as pq
+            self.writer = pq.ParquetWriter(path, self.schema)
+        else:
+            self.writer = pa.ipc.new_file(path, self.schema)
+
+    # Record one event; values follow the order of FIELDS
+    def record(self, action, *values):
+        k = self.size
+        self.actions[k] = action
+        self.sequence[k] = self.num_events + k
+        for column, value in zip(self.columns.values(), values):
+            column[k] = value
+        self.size = k + 1
+        if self.size == self.batch_size:
+            self.flush()
+
+    # Record many events at once; action is a code or an array of codes and every
+    # FIELDS entry is a scalar or an array of the same length
+    def record_batch(self, action, count, **values):
+        start = 0
+        while start < count:
+            take = min(count - start, self.batch_size - self.size)
+            rows = slice(self.size, self.size + take)
+            self.actions[rows] = action if np.isscalar(action) else action[start:start + take]
+            self.sequence[rows] = np.arange(self.num_events + self.size, self.num_events + self.size + take)
+            for name, column in self.columns.items():
+                value = values[name]
+                column[rows] = value if np.isscalar(value) else value[start:start + take]
+            self.size += take
+            start += take
+            if self.size == self.batch_size:
+                self.flush()
+
+    # Write the buffered rows out as one record batch
+    def flush(self):
+        if not self.size:
+            return
+        pa = self.pa
+        n = self.size
+        arrays = [pa.DictionaryArray.from_arrays(pa.array(self.actions[:n]), self.action_names),
+                  pa.array(self.sequence[:n])]
+        arrays += [pa.array(column[:n]) for column in self.columns.values()]
+        self.writer.write_batch(pa.RecordBatch.from_arrays(arrays, schema=self.schema))
+        self.num_events += n
+        self.size = 0
+
+    def close(self):
+        self.flush()
+        self.writer.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+# Post.interact for the object path with the event written to the log
+def log_interaction(events, post, user, update_rule, draw):
+    user_x, user_y = user.experiment_x, user.experiment_y
+    post_x, post_y, quality = post.experiment_x, post.experiment_y, post.experiment_quality
+    action = post.interact(user, update_rule, draw)
+    if action != NONE:
+        distance = ((user_x - post_x) ** 2 + (user_y - post_y) ** 2) ** 0.5
+        events.record(action, user.user_id, post.post_id, distance, user_x, user_y, user.experiment_x,
+                      user.experiment_y, post_x, post_y, post.experiment_x, post.experiment_y, quality,
+                      post.experiment_quality)
+    return action
@@ -0,0 +1,385 @@
+import argparse
+import contextlib
+import random
+import shutil
+from functools import partial
+
+import numpy as np
+
+from .cache import ResultCache
+from .engine import print_interaction_summary, simulate
+from .events import EventLog, log_interaction
+from .instrumentation import NULL_TIMER, StageTimer
+from .kernel import simulate_jit
+from .metrics import ErrorMetrics
+from .models import Post, User, create_posts, create_users
+from .ranking import RANKINGS
+from .sampling import uniform_block
+from .sharded import simulate_sharded
+from .strategies import ACTIONS, BEHAVIOR_BY_NAME, LIKE, NONE, VARIANTS, get_model, get_update_rule, in_corner
+
+# Suffix each variant adds to its plot file names
+OUTPUT_SUFFIX = {
+    'test1': '',
+    'test2': '_test2',
+    'test3': '_test3',
+}
+
+
+# Run a variant on the array-backed engine and keep the results as columns
+# feed_radius / feed_size switch on the neighbourhood feed, feed_rank / rank_batch /
+# feed_size on the ranked feed, and checkpoint saves and resumes the run (see
+# engine.simulate). With workers > 1 the posts are split over that many processes,
+# combined as shard_mode says (see sharded.simulate_sharded). jit runs the sweep
+# through the Numba-compiled kernel instead (see kernel.simulate_jit).
+def run_numpy_simulation(variant, num_users, num_posts_per_user, history_size=0, pull_strength=0.1,
+                         timer=NULL_TIMER, feed_radius=None, feed_size=None, events=None, checkpoint=None,
+                         checkpoint_every=1000, rng=None, workers=1, shard_mode='exact', metrics=None, jit=False,
+                         feed_rank=None, rank_batch=1, distributions=None):
+    feed = feed_radius is not None or feed_rank is not None
+    if jit:
+        if feed or events is not None or checkpoint is not None or workers > 1:
+            raise ValueError("The compiled kernel supports neither the feed, event logging, checkpoints nor sharding")
+        sim = simulate_jit(num_users, num_posts_per_user, pull_strength=pull_strength, history_size=history_size,
+                           rng=rng, timer=timer, metrics=metrics, distributions=distributions, **VARIANTS[variant])
+        print_interaction_summary(sim.action_tallies())
+        return sim
+    if workers > 1:
+        if feed or events is not None or checkpoint is not None:
+            raise ValueError("Sharded runs support neither the feed, event logging nor checkpoints")
+        sim = simulate_sharded(num_users, num_posts_per_user, pull_strength=pull_strength, history_size=history_size,
+                               rng=rng, timer=timer, num_workers=workers, mode=shard_mode,
+                               distributions=distributions, **VARIANTS[variant])
+        # The shard workers do not track errors, so they are taken from the final columns
+        if metrics is not None:
+            metrics.set_arrays(sim)
+        print_interaction_summary(sim.action_tallies())
+        return sim
+    sim = simulate(num_users, num_posts_per_user, pull_strength=pull_strength, history_size=history_size,
+                   timer=timer, feed_radius=feed_radius, feed_size=feed_size, events=events, checkpoint=checkpoint,
+                   checkpoint_every=checkpoint_every, rng=rng, metrics=metrics, feed_rank=feed_rank,
+                   rank_batch=rank_batch, distributions=distributions, **VARIANTS[variant])
+    print_interaction_summary(sim.action_tallies())
+    return sim
+
+
+# Add or drop post k from the corner set after a like may have moved it
+def refile_corner(corner_posts, k, post):
+    if in_corner(post.experiment_x, post.experiment_y):
+        corner_posts.add(k)
+    else:
+        corner_posts.discard(k)
+
+
+# Post columns the error metrics are computed from
+ERROR_FIELDS = ['quality', 'x', 'y', 'experiment_x', 'experiment_y', 'experiment_quality']
+
+
+# Bring metrics up to date for the user at index n and the posts at indices touched
+def track_errors(metrics, n, user, posts, touched):
+    metrics.set_users(n, user.x, user.y, user.experiment_x, user.experiment_y)
+    metrics.set_posts(touched, **to_columns([posts[k] for k in touched], ERROR_FIELDS))
+
+
+# Simulate interactions between users and posts for one of the named variants.
+# Pass an events.EventLog as events to record every like and dislike, and a
+# metrics.ErrorMetrics as metrics to have the error metrics kept up to date.
+# rng is where every random draw comes from: a NumPy Generator, or for the python
+# engine also a random.Random. The python engine falls back to the global random
+# module and the numpy engine to a fresh Generator. Both engines take draws in the
+# same order, so the same seeded Generator gives the same run on either. engine='numba'
+# is the numpy engine with the compiled kernel. distributions replaces how some
+# population attributes are drawn (see models.create_users). Pass a dict as tallies to
+# have the per-type action counts the summary is printed from stored in it.
+def run_simulation(variant, num_users, num_posts_per_user, engine='python', history_size=0, pull_strength=0.1,
+                   timer=NULL_TIMER, feed_radius=None, feed_size=None, events=None, checkpoint=None,
+                   checkpoint_every=1000, rng=None, workers=1, shard_mode='exact', metrics=None, feed_rank=None,
+                   rank_batch=1, distributions=None, tallies=None):
+    if engine in ('numpy', 'numba'):
+        sim = run_numpy_simulation(
+            variant, num_users, num_posts_per_user, history_size=history_size, pull_strength=pull_strength,
+            timer=timer, feed_radius=feed_radius, feed_size=feed_size, events=events, checkpoint=checkpoint,
+            checkpoint_every=checkpoint_every, rng=rng, workers=workers, shard_mode=shard_mode, metrics=metrics,
+            jit=engine == 'numba', feed_rank=feed_rank, rank_batch=rank_batch, distributions=distributions)
+        if tallies is not None:
+            tallies.update(sim.action_tallies())
+        return sim.to_objects(User, Post)
+    if feed_radius is not None:
+        raise ValueError("The neighbourhood feed needs the numpy engine")
+    if feed_rank is not None:
+        raise ValueError("The ranked feed needs the numpy engine")
+    if checkpoint is not None:
+        raise ValueError("Checkpointing needs the numpy engine")
+    if workers > 1:
+        raise ValueError("Sharded runs need the numpy engine")
+    if rng is None:
+        rng = random
+
+    config = VARIANTS[variant]
+    update_rule = get_update_rule(config['update_rule'], pull_strength)
+    with timer.stage('create_users'):
+        users = create_users(num_users, get_model(config['model']), history_size, rng, distributions)
+    counts_by_type = {}
+
+    # Each user creates multiple posts
+    with timer.stage('create_posts'):
+        posts = create_posts(users, num_posts_per_user, rng, distributions)
+
+    # Indices of the posts in a corner, re-checked whenever a like moves a post. Only
+    # corner-only users read it, so without any it is not kept.
+    track_corners = any(BEHAVIOR_BY_NAME[user.user_type].corner_only for user in users)
+    corner_posts = set()
+    if track_corners:
+        corner_posts = {k for k, post in enumerate(posts) if in_corner(post.experiment_x, post.experiment_y)}
+    interact = Post.interact if events is None else partial(log_interaction, events)
+    if metrics is not None:
+        metrics.set_users(slice(None), **to_columns(users, ['x', 'y', 'experiment_x', 'experiment_y']))
+        metrics.set_posts(slice(None), **to_columns(posts, ERROR_FIELDS))
+
+    # Users interact with each post
+    with timer.stage('interactions'):
+        for n, user in enumerate(users):
+            counts = counts_by_type.setdefault(user.user_type, [0] * len(ACTIONS))
+            if BEHAVIOR_BY_NAME[user.user_type].corner_only:
+                # Only corner posts can get a reaction, so the rest are skipped; the decision
+                # ignores the draw, so none is taken
+                touched = sorted(corner_posts)
+                for k in touched:
+                    counts[interact(posts[k], user, update_rule, 0.0)] += 1
+                    refile_corner(corner_posts, k, posts[k])
+                counts[NONE] += len(posts) - len(touched)
+            else:
+                # Posts the pass liked or disliked
+                touched = []
+                # One uniform draw per post, drawn as a block for the whole pass
+                for k, (post, draw) in enumerate(zip(posts, uniform_block(len(posts), rng))):
+                    # The action code is decided once, inside interact, and reported back
+                    action = interact(post, user, update_rule, draw)
+                    counts[action] += 1
+                    if action != NONE:
+                        touched.append(k)
+                        if action == LIKE and track_corners:
+                            refile_corner(corner_posts, k, post)
+            if metrics is not None:
+                track_errors(metrics, n, user, posts, touched)
+
+    summary = {user_type: dict(zip(ACTIONS, counts)) for user_type, counts in counts_by_type.items()}
+    if tallies is not None:
+        tallies.update(summary)
+    print_interaction_summary(summary)
+
+    return users, posts
+
+
+# Gather one list per attribute so DataFrames can be built column by column
+def to_columns(objects, fields):
+    return {field: [getattr(obj, field) for obj in objects] for field in fields}
+
+
+# Test the simulation for one variant and visualize results
+# Pass a StageTimer as timer to record how long each stage takes.
+# With a cache.ResultCache as cache, a seeded run whose configuration was seen before
+# is read back from the cache, figures included, instead of being simulated again.
+# The error metrics are kept up to date during the run, so the user and post DataFrames
+# are only built when dataframes is set (their first rows are printed) or seaborn draws
+# the plots, and the columns behind them only when something uses them. plots='none'
+# skips the figures. plots='background' draws the fast plots in plotter, a
+# plots.BackgroundPlotter shared between runs, and returns the Future of the drawing so
+# the next run can start while it is drawn; without a plotter the drawing is waited for.
+def test_simulation(variant='test1', engine='python', num_users=100, num_posts_per_user=5, timer=NULL_TIMER,
+                    feed_radius=None, feed_size=None, events=None, checkpoint=None, checkpoint_every=1000,
+                    plots='seaborn', seed=None, cache=None, workers=1, shard_mode='exact', dataframes=False,
+                    feed_rank=None, rank_batch=1, plotter=None):
+    # The plotting layer is only loaded here, so run_simulation and the process-pool
+    # workers that call the engine start without it
+    from .plots import BackgroundPlotter, plot_paths, save_plots
+
+    if feed_radius is not None and engine == 'python':
+        raise ValueError("The neighbourhood feed needs the numpy engine")
+    if feed_rank is not None and engine == 'python':
+        raise ValueError("The ranked feed needs the numpy engine")
+    if checkpoint is not None and engine == 'python':
+        raise ValueError("Checkpointing needs the numpy engine")
+    if workers > 1 and engine == 'python':
+        raise ValueError("Sharded runs need the numpy engine")
+    # A seed gives both engines the same Generator stream; without one the python
+    # engine keeps using the global random module
+    rng = np.random.default_rng(seed) if seed is not None else None
+
+    cached = None
+    if cache is not None:
+        if seed is None:
+            raise ValueError("Only seeded runs can be cached")
+        cache_config = {'variant': variant, 'engine': engine, 'num_users': num_users,
+                        'num_posts_per_user': num_posts_per_user, 'feed_radius': feed_radius,
+                        'feed_size': feed_size, 'plots': 'fast' if plots == 'background' else plots,
+                        'seed': seed}
+        if feed_rank is not None:
+            cache_config.update(feed_rank=feed_rank, rank_batch=rank_batch)
+        # Exact shards reproduce the sequential run, so only relaxed ones get their own entries
+        if workers > 1 and shard_mode != 'exact':
+            cache_config['shard_mode'] = shard_mode
+        # A run asked to log its events has to actually run
+        if events is None:
+            with timer.stage('cache_lookup'):
+                cached = cache.get(cache_config)
+
+    # User and post columns, as arrays or lists keyed by attribute name
+    if cached is not None:
+        user_columns, post_columns, metrics = cached['users'], cached['posts'], cached['metrics']
+        # A run prints its interaction summary as it finishes; a cached one prints the stored one
+        tallies = cached['tallies']
+        if tallies:
+            print_interaction_summary(tallies)
+    else:
+        errors = ErrorMetrics(num_users, num_users * num_posts_per_user)
+        if engine != 'python':
+            sim = run_numpy_simulation(variant, num_users, num_posts_per_user, timer=timer, feed_radius=feed_radius,
+                                       feed_size=feed_size, events=events, checkpoint=checkpoint,
+                                       checkpoint_every=checkpoint_every, rng=rng, workers=workers,
+                                       shard_mode=shard_mode, metrics=errors, jit=engine == 'numba',
+                                       feed_rank=feed_rank, rank_batch=rank_batch)
+            tallies = sim.action_tallies()
+        else:
+            tallies = {}
+            users, posts = run_simulation(variant, num_users, num_posts_per_user, timer=timer, events=events, rng=rng,
+                                          metrics=errors, tallies=tallies)
+        metrics = errors.result()
+
+        # The columns only feed the DataFrames, the plots and the cache
+        user_columns = post_columns = None
+        if dataframes or plots != 'none' or cache is not None:
+            user_fields = [field for field in User.__slots__ if field != 'liked_history']
+            if engine != 'python':
+                user_columns = sim.user_columns(user_fields)
+                post_columns = sim.post_columns(Post.__slots__)
+            else:
+                with timer.stage('columns'):
+                    user_columns = to_columns(users, user_fields)
+                    post_columns = to_columns(posts, Post.__slots__)
+
+    # A cache hit has its figures already, so only printing them needs the DataFrames
+    if dataframes or (plots == 'seaborn' and cached is None):
+        import pandas as pd
+
+        with timer.stage('dataframes'):
+            user_df = pd.DataFrame(user_columns)
+            post_df = pd.DataFrame(post_columns)
+    if dataframes:
+        # Print the start of each dataframe
+        print("Users DataFrame:")
+        print(user_df.head())
+
+        print("\nPosts DataFrame:")
+        print(post_df.head())
+
+    # Standard deviation calculations for differences between actual and experimental
+    print("\nStandard Deviations:")
+    for name, value in metrics.items():
+        print(f"{name}: {value:.2f}")
+
+    if cached is not None:
+        for path in cached['figures']:
+            shutil.copy(path, '.')
+        return
+
+    figures = []
+    drawing = None
+    if plots == 'seaborn':
+        save_plots(user_df, post_df, OUTPUT_SUFFIX[variant], timer=timer)
+    elif plots == 'fast':
+        save_plots(user_columns, post_columns, OUTPUT_SUFFIX[variant], timer=timer, style='fast')
+    elif plots == 'background':
+        if plotter is None:
+            with BackgroundPlotter() as own_plotter:
+                own_plotter.submit(user_columns, post_columns, OUTPUT_SUFFIX[variant]).result()
+        else:
+            drawing = plotter.submit(user_columns, post_columns, OUTPUT_SUFFIX[variant])
+    if plots != 'none':
+        figures = plot_paths(OUTPUT_SUFFIX[variant])
+    if cache is not None:
+        # The cache copies the figures, so they have to be drawn first
+        if drawing is not None:
+            drawing.result()
+        with timer.stage('cache_store'):
+            cache.put(cache_config, user_columns, post_columns, {name: float(value) for name, value in metrics.items()},
+                      figures, tallies)
+    return drawing
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run simulation variants one after another and save their plots")
+    parser.add_argument('variants', nargs='+', choices=sorted(VARIANTS), metavar='variant')
+    parser.add_argument('--engine', choices=['python', 'numpy', 'numba'], default='python',
+                        help="'numba' runs the numpy engine's sweep through a compiled kernel when Numba is "
+                             "installed")
+    parser.add_argument('--users', type=int, default=100)
+    parser.add_argument('--posts-per-user', type=int, default=5)
+    parser.add_argument('--feed-radius', type=float,
+                        help="Users only see posts within this distance (numpy engine only)")
+    parser.add_argument('--feed-size', type=int, help="At most this many of those posts, sampled at random, or "
+                                                      "the number of ranked posts each user sees")
+    parser.add_argument('--feed-rank', choices=sorted(RANKINGS),
+                        help="Each user only sees the --feed-size posts this policy ranks highest (numpy engine only)")
+    parser.add_argument('--rank-batch', type=int, default=1,
+                        help="Users whose feeds are scored together, against the state at the start of the batch")
+    parser.add_argument('--events', help="Log every like and dislike to this Parquet (or .arrow) file")
+    parser.add_argument('--checkpoint', help="Save progress to this .npz file and resume from it if it exists "
+                                             "(numpy engine only)")
+    parser.add_argument('--checkpoint-every', type=int, default=1000, help="Users between checkpoints")
+    parser.add_argument('--workers', type=int, default=1,
+                        help="Split the posts over this many processes (numpy engine only)")
+    parser.add_argument('--shard-mode', choices=['exact', 'relaxed'], default='exact',
+                        help="'relaxed' runs the shards side by side and merges user moves between batches")
+    parser.add_argument('--seed', type=int, help="Seed for a reproducible run, the same on both engines")
+    parser.add_argument('--plots', choices=['seaborn', 'fast', 'background', 'none'], default='seaborn',
+                        help="'fast' draws binned densities with NumPy instead of seaborn KDEs; 'background' "
+                             "draws them in another process while the next variant runs")
+    parser.add_argument('--dataframes', action='store_true',
+                        help="Build the user and post DataFrames and print their first rows")
+    parser.add_argument('--cache-dir', help="Reuse results of earlier seeded runs stored in this directory")
+    parser.add_argument('--cache-max-mb', type=float, default=1024, help="Size the result cache is trimmed to")
+    parser.add_argument('--timings', action='store_true', help="Print wall/CPU time per stage")
+    parser.add_argument('--timings-json', help="Also write the stage timings to this JSON file")
+    parser.add_argument('--trace-memory', action='store_true', help="Record allocations per stage with tracemalloc")
+    parser.add_argument('--profile', help="Run the stages under cProfile and save the stats to this file")
+    args = parser.parse_args()
+    if args.checkpoint and len(args.variants) > 1:
+        parser.error("--checkpoint takes a single variant")
+    # Ids restart at 1 in every run and the log has no column for the run
+    if args.events and len(args.variants) > 1:
+        parser.error("--events takes a single variant")
+
+    instrumented = args.timings or args.timings_json or args.trace_memory or args.profile
+    timer = StageTimer(profile=bool(args.profile), trace_memory=args.trace_memory) if instrumented else NULL_TIMER
+    cache = ResultCache(args.cache_dir, int(args.cache_max_mb * 2 ** 20)) if args.cache_dir else None
+    if args.plots == 'background':
+        from .plots import BackgroundPlotter
+    with EventLog(args.events) if args.events else contextlib.nullcontext() as events, \
+            BackgroundPlotter() if args.plots == 'background' else contextlib.nullcontext() as plotter:
+        drawings = []
+        for variant in args.variants:
+            if len(args.variants) > 1:
+                print(f"\n=== {variant} ===")
+            drawings.append(test_simulation(
+                variant, engine=args.engine, num_users=args.users, num_posts_per_user=args.posts_per_user,
+                timer=timer, feed_radius=args.feed_radius, feed_size=args.feed_size, events=events,
+                checkpoint=args.checkpoint, checkpoint_every=args.checkpoint_every, plots=args.plots, seed=args.seed,
+                cache=cache, workers=args.workers, shard_mode=args.shard_mode, dataframes=args.dataframes,
+                feed_rank=args.feed_rank, rank_batch=args.rank_batch, plotter=plotter))
+        # Raise any error from the background plots
+        for drawing in drawings:
+            if drawing is not None:
+                drawing.result()
+    if args.events:
+        print(f"\n{events.num_events} events written to {args.events}")
+
+    if instrumented:
+        timer.close()
+        print("\nStage Timings:")
+        print(timer.summary())
+        if args.timings_json:
+            timer.to_json(args.timings_json)
+        if args.profile:
+            timer.dump_profile(args.profile)
+            print(timer.profile_stats())
@@ -0,0 +1,88 @@
+import contextlib
+import cProfile
+import io
+import json
+import pstats
+import time
+import tracemalloc
+
+
+# Stage timer that records nothing; the default so instrumentation costs nothing when off
+class NullTimer:
+    def stage(self, name):
+        return contextlib.nullcontext()
+
+
+NULL_TIMER = NullTimer()
+
+
+# Records wall time, CPU time and optionally allocation deltas for each named stage.
+# With profile=True every stage also runs under one shared cProfile profiler, and with
+# trace_memory=True tracemalloc reports how much each stage allocated and its peak.
+class StageTimer:
+    def __init__(self, profile=False, trace_memory=False):
+        self.records = []
+        self.profiler = cProfile.Profile() if profile else None
+        self.trace_memory = trace_memory
+
+    @contextlib.contextmanager
+    def stage(self, name):
+        if self.trace_memory:
+            if not tracemalloc.is_tracing():
+                tracemalloc.start()
+            tracemalloc.reset_peak()
+            memory_before = tracemalloc.get_traced_memory()[0]
+        if self.profiler is not None:
+            self.profiler.enable()
+        wall_start = time.perf_counter()
+        cpu_start = time.process_time()
+        try:
+            yield
+        finally:
+            record = {
+                'stage': name,
+                'wall_seconds': time.perf_counter() - wall_start,
+                'cpu_seconds': time.process_time() - cpu_start,
+            }
+            if self.profiler is not None:
+                self.profiler.disable()
+            if self.trace_memory:
+                current, peak = tracemalloc.get_traced_memory()
+                record['allocated_bytes'] = current - memory_before
+                record['peak_bytes'] = peak - memory_before
+            self.records.append(record)
+
+    # Stop tracemalloc if this timer started it
+    def close(self):
+        if self.trace_memory and tracemalloc.is_tracing():
+            tracemalloc.stop()
+
+    # Fixed-width table of the recorded stages with each stage's share of the total
+    def summary(self):
+        total = sum(record['wall_seconds'] for record in self.records) or 1.0
+        lines = [f"{'Stage':<24}{'Wall (s)':>10}{'CPU (s)':>10}{'Share':>8}"
+                 + (f"{'Alloc (MiB)':>13}{'Peak (MiB)':>12}" if self.trace_memory else "")]
+        for record in self.records:
+            line = (f"{record['stage']:<24}{record['wall_seconds']:>10.3f}{record['cpu_seconds']:>10.3f}"
+                    f"{record['wall_seconds'] / total:>8.1%}")
+            if self.trace_memory:
+                line += f"{record['allocated_bytes'] / 2 ** 20:>13.2f}{record['peak_bytes'] / 2 ** 20:>12.2f}"
+            lines.append(line)
+        return "\n".join(lines)
+
+    def to_json(self, path):
+        with open(path, 'w') as f:
+            json.dump(self.records, f, indent=2)
+
+    # Top functions by cumulative time across all profiled stages
+    def profile_stats(self, limit=20):
+        if self.profiler is None:
+            return ""
+        stream = io.StringIO()
+        pstats.Stats(self.profiler, stream=stream).sort_stats('cumulative').print_stats(limit)
+        return stream.getvalue()
+
+    # Save raw cProfile data for snakeviz / pstats
+    def dump_profile(self, path):
+        if self.profiler is not None:
+            self.profiler.dump_stats(path)
@@ -0,0 +1,180 @@
+import argparse
+import functools
+import sys
+
+import numpy as np
+
+from . import engine
+from .instrumentation import NULL_TIMER
+from .strategies import (BEHAVIORS, CORNER, DISLIKE, LIKE, NONE, USER_TYPES, VARIANTS, RubberBand, RunningAverage,
+                         get_model)
+
+# Type codes the kernel knows; it spells out each of these behaviours itself
+RANDOM, AGREE, QUALITY, EXTREMIST = (USER_TYPES.index(name) for name in ('random', 'agree', 'quality', 'extremist'))
+
+# Update rule codes passed to the kernel
+RULE_CODES = {'average': 0, 'rubber_band': 1}
+AVERAGE = RULE_CODES['average']
+
+# Draws handed to a corner-only user's pass, which takes none
+NO_DRAWS = np.zeros(0)
+
+
+# User i's pass over every post, one post at a time: User.decide_action followed by
+# Post.interact with the update rule, written over flat columns in plain loops so
+# Numba can compile it. Every like moves the post and the user before the next post
+# is looked at, exactly as on the object path. behavior is the user's type code, rule
+# a RULE_CODES value; counts is the user type's row of action_counts.
+def interaction_pass(i, draws, behavior, rule, pull, user_ex, user_ey, user_eq, liked_sum_x, liked_sum_y, num_liked,
+                     liked_history, post_ex, post_ey, post_eq, likes, dislikes, total_likers_x, total_likers_y,
+                     counts):
+    history_size = liked_history.shape[1]
+    user_quality = user_eq[i]
+    ux = user_ex[i]
+    uy = user_ey[i]
+    for j in range(len(post_ex)):
+        px = post_ex[j]
+        py = post_ey[j]
+        distance = ((ux - px) ** 2 + (uy - py) ** 2) ** 0.5
+        quality_factor = post_eq[j] / 10000
+
+        # Decide, as the UserBehavior subclasses in strategies.py do
+        if behavior == EXTREMIST:
+            action = LIKE if abs(px) >= CORNER and abs(py) >= CORNER else NONE
+        else:
+            if behavior == RANDOM:
+                prob_like = 0.15
+                prob_dislike = 0.15
+            elif behavior == AGREE:
+                prob_like = 0.4 * (1 - distance / 10) + 0.3 * quality_factor
+                prob_dislike = 0.3 * (distance / 10) + 0.2 * (1 - quality_factor)
+            else:
+                prob_like = 0.5 * quality_factor + 0.2 * (1 - distance / 10)
+                prob_dislike = 0.4 * (distance / 10) + 0.3 * (1 - quality_factor)
+            draw = draws[j]
+            if draw < prob_like:
+                action = LIKE
+            elif draw < prob_like + prob_dislike:
+                action = DISLIKE
+            else:
+                action = NONE
+
+        # Apply, as Post.interact and the update rules do
+        if action == LIKE:
+            likes[j] += 1
+            if rule == AVERAGE:
+                total_likers_x[j] += ux
+                total_likers_y[j] += uy
+                px = max(-5.0, min(5.0, total_likers_x[j] / likes[j]))
+                py = max(-5.0, min(5.0, total_likers_y[j] / likes[j]))
+                post_ex[j] = px
+                post_ey[j] = py
+                count = num_liked[i]
+                if history_size:
+                    liked_history[i, count % history_size, 0] = px
+                    liked_history[i, count % history_size, 1] = py
+                count += 1
+                num_liked[i] = count
+                liked_sum_x[i] += px
+                liked_sum_y[i] += py
+                ux = max(-5.0, min(5.0, liked_sum_x[i] / count))
+                uy = max(-5.0, min(5.0, liked_sum_y[i] / count))
+            else:
+                ux = max(-5.0, min(5.0, ux + pull * (px - ux)))
+                uy = max(-5.0, min(5.0, uy + pull * (py - uy)))
+                post_ex[j] = max(-5.0, min(5.0, px + pull * (ux - px)))
+                post_ey[j] = max(-5.0, min(5.0, py + pull * (uy - py)))
+            quality_boost = (1 - distance / 10) * user_quality / 10000
+            post_eq[j] = min(10000.0, post_eq[j] + quality_boost * 100)
+        elif action == DISLIKE:
+            dislikes[j] += 1
+            quality_drop = (1 - distance / 10) * user_quality / 10000
+            post_eq[j] = max(0.0, post_eq[j] - quality_drop * 100)
+        counts[action] += 1
+    user_ex[i] = ux
+    user_ey[i] = uy
+
+
+# interaction_pass compiled with Numba, or None when Numba is not installed. Compiled
+# code is cached next to this module, so only the first run pays for compilation.
+@functools.lru_cache(maxsize=None)
+def compiled_pass():
+    try:
+        import numba
+    except ImportError:
+        return None
+    return numba.njit(cache=True)(interaction_pass)
+
+
+# Run the whole simulation with the compiled pass. Draws are taken as engine.simulate
+# takes them, one block of num_posts per user that is not corner-only, so a seeded run
+# sees the same stream. Without Numba this is engine.simulate, whose passes give the
+# same sequential result in NumPy. Pass a metrics.ErrorMetrics as metrics to have it
+# filled in at the end.
+def simulate_jit(num_users, num_posts_per_user, model='classic', update_rule='average', pull_strength=0.1,
+                 type_weights=None, history_size=0, rng=None, timer=NULL_TIMER, metrics=None, distributions=None):
+    kernel = compiled_pass()
+    if kernel is None:
+        return engine.simulate(num_users, num_posts_per_user, model, update_rule, pull_strength, type_weights,
+                               history_size, rng, timer, metrics=metrics, distributions=distributions)
+    if rng is None:
+        rng = np.random.default_rng()
+
+    with timer.stage('create_population'):
+        sim = engine.SimulationArrays(num_users, num_users * num_posts_per_user, update_rule, pull_strength,
+                                      history_size)
+        engine.populate(sim, num_posts_per_user, get_model(model, type_weights), rng, distributions)
+    if not isinstance(sim.update_rule, (RunningAverage, RubberBand)):
+        raise ValueError(f"The compiled kernel has no version of the {sim.update_rule.name!r} update rule")
+    unknown = set(np.unique(sim.user_type).tolist()) - {RANDOM, AGREE, QUALITY, EXTREMIST}
+    if unknown:
+        raise ValueError(f"The compiled kernel has no version of user types {[USER_TYPES[c] for c in unknown]}")
+    rule = RULE_CODES[sim.update_rule.name]
+    pull = float(getattr(sim.update_rule, 'pull_strength', 0.0))
+
+    with timer.stage('interactions'):
+        for i, code in enumerate(sim.user_type.tolist()):
+            draws = NO_DRAWS if BEHAVIORS[code].corner_only else rng.random(sim.num_posts)
+            kernel(i, draws, code, rule, pull, sim.user_experiment_x, sim.user_experiment_y,
+                   sim.user_experiment_quality, sim.liked_sum_x, sim.liked_sum_y, sim.num_liked, sim.liked_history,
+                   sim.post_experiment_x, sim.post_experiment_y, sim.post_experiment_quality, sim.likes,
+                   sim.dislikes, sim.total_likers_x, sim.total_likers_y, sim.action_counts[code])
+        sim.refresh_corners()
+    if metrics is not None:
+        metrics.set_arrays(sim)
+    return sim
+
+
+# Names of the ndarray columns (action_counts included) that differ between two runs
+def mismatched_columns(expected, actual):
+    return [name for name, column in vars(expected).items()
+            if isinstance(column, np.ndarray) and not np.array_equal(column, getattr(actual, name))]
+
+
+# Seeded comparison against the NumPy engine: the same seed through both, then each
+# error metric and the action counts side by side. Exits with status 1 when any
+# column differs.
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compare the compiled kernel with the NumPy engine on one seed")
+    parser.add_argument('variant', choices=sorted(VARIANTS))
+    parser.add_argument('--users', type=int, default=1000)
+    parser.add_argument('--posts-per-user', type=int, default=5)
+    parser.add_argument('--history-size', type=int, default=0)
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    if compiled_pass() is None:
+        print("Numba is not installed; simulate_jit falls back to the NumPy engine")
+    runs = {}
+    for name, run in (('numpy', engine.simulate), ('kernel', simulate_jit)):
+        runs[name] = run(args.users, args.posts_per_user, history_size=args.history_size,
+                         rng=np.random.default_rng(args.seed), **VARIANTS[args.variant])
+    reference, compiled = (engine.error_metrics(sim) for sim in runs.values())
+    print(f"{'Metric':>10}{'NumPy':>14}{'Kernel':>14}{'Difference':>14}")
+    for name in reference:
+        print(f"{name:>10}{reference[name]:>14.6f}{compiled[name]:>14.6f}{compiled[name] - reference[name]:>14.2e}")
+    print(f"{'Actions':>10}{runs['numpy'].interaction_count:>14}{runs['kernel'].interaction_count:>14}")
+    mismatched = mismatched_columns(runs['numpy'], runs['kernel'])
+    if mismatched:
+        print(f"Columns that differ: {', '.join(mismatched)}")
+        sys.exit(1)
@@ -0,0 +1,43 @@
+import numpy as np
+
+# Error metrics in the order they are reported
+METRICS = ['User X', 'User Y', 'Post X', 'Post Y', 'Quality']
+
+
+# Squared-error sums behind the Standard Deviations report, kept up to date while a run
+# moves users and posts. The current squared error of every user and post is stored,
+# so a change only swaps its old term in the sums for the new one and the report is
+# O(1) at any point, without building DataFrames. Users and posts are set by index:
+# one int, a slice, or an array of distinct indices with matching value arrays.
+class ErrorMetrics:
+    def __init__(self, num_users, num_posts):
+        self.user_errors = np.zeros((2, num_users))  # Rows: x, y
+        self.post_errors = np.zeros((3, num_posts))  # Rows: x, y, quality
+        self.sums = np.zeros(len(METRICS))  # Columns follow METRICS
+
+    def set_users(self, index, x, y, experiment_x, experiment_y):
+        self._replace(self.user_errors, self.sums[:2], index, (x, experiment_x), (y, experiment_y))
+
+    def set_posts(self, index, quality, x, y, experiment_x, experiment_y, experiment_quality):
+        self._replace(self.post_errors, self.sums[2:], index, (x, experiment_x), (y, experiment_y),
+                      (np.multiply(quality, 10000), experiment_quality))
+
+    @staticmethod
+    def _replace(errors, sums, index, *pairs):
+        for row, (actual, experimental) in enumerate(pairs):
+            error = np.square(np.subtract(actual, experimental, dtype=float))
+            sums[row] += np.sum(error) - np.sum(errors[row, index])
+            errors[row, index] = error
+
+    # Every user and post of a SimulationArrays, e.g. once it is populated
+    def set_arrays(self, sim):
+        self.set_users(slice(None), sim.user_x, sim.user_y, sim.user_experiment_x, sim.user_experiment_y)
+        self.set_posts(slice(None), sim.post_quality, sim.post_x, sim.post_y, sim.post_experiment_x,
+                       sim.post_experiment_y, sim.post_experiment_quality)
+
+    # Root-mean-square errors keyed by METRICS, the same values engine.error_metrics gives
+    def result(self):
+        counts = [self.user_errors.shape[1]] * 2 + [self.post_errors.shape[1]] * 3
+        # Swapping terms in and out can leave a tiny negative rounding residue
+        return {name: (max(0.0, float(total)) / count) ** 0.5 if count else float('nan')
+                for name, total, count in zip(METRICS, self.sums, counts)}
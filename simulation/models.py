@@ -0,0 +1,158 @@
+import random
+from collections import deque
+
+from .population import generate_posts, generate_users, split_distributions, user_name
+from .strategies import ACTIONS, BEHAVIOR_BY_NAME, LIKE, DISLIKE, USER_TYPES, RunningAverage, get_model
+
+# Update rule used by Post.interact when none is given
+DEFAULT_UPDATE_RULE = RunningAverage()
+
+
+# Class to represent a user in the simulation
+class User:
+    # Fixed attribute slots keep each user small and attribute access fast
+    __slots__ = ('user_id', 'name', 'quality', 'x', 'y', 'experiment_x', 'experiment_y', 'experiment_quality',
+                 'user_type', 'liked_sum_x', 'liked_sum_y', 'num_liked', 'liked_history')
+
+    # rng is any source with random() and uniform(), e.g. a random.Random or a NumPy
+    # Generator; the global random module by default. It is only drawn from for the
+    # experimental coordinates not given.
+    def __init__(self, user_id, name, quality, x, y, user_type, history_size=0, rng=random, experiment_x=None,
+                 experiment_y=None):
+        self.user_id = user_id
+        self.name = name
+        self.quality = quality  # User quality score between 0 and 1
+        self.x = x  # Initial x-coordinate, between -5 and 5
+        self.y = y  # Initial y-coordinate, between -5 and 5
+        # Experimental coordinates start near the center
+        self.experiment_x = rng.uniform(-2, 2) if experiment_x is None else experiment_x
+        self.experiment_y = rng.uniform(-2, 2) if experiment_y is None else experiment_y
+        self.experiment_quality = 5000  # Default experimental quality, ranges between 0 and 10000
+        self.user_type = user_type  # Name of a behavior in strategies.BEHAVIORS
+        self.liked_sum_x = 0  # Running sum of liked post x-coordinates
+        self.liked_sum_y = 0  # Running sum of liked post y-coordinates
+        self.num_liked = 0  # Number of posts liked so far
+        self.liked_history = deque(maxlen=history_size) if history_size else None  # Most recent liked (x, y), if kept
+
+    # Create a new post by the user
+    def create_post(self, posts, rng=random):
+        quality = rng.random()
+        x = rng.uniform(-5, 5)
+        y = rng.uniform(-5, 5)
+        post_id = len(posts) + 1
+        post = Post(post_id, self.user_id, quality, x, y)
+        posts.append(post)
+
+    # Decide whether to like, dislike, or ignore a post according to the user's type.
+    # Returns an action code; draw is one uniform variate, taken from rng when not given.
+    def decide_action(self, post, draw=None, rng=random):
+        distance = ((self.experiment_x - post.experiment_x) ** 2 + (self.experiment_y - post.experiment_y) ** 2) ** 0.5
+        quality_factor = post.experiment_quality / 10000
+        behavior = BEHAVIOR_BY_NAME[self.user_type]
+        if draw is None:
+            draw = rng.random()
+        return behavior.decide(distance, quality_factor, draw, post.experiment_x, post.experiment_y)
+
+    # Same decision as an action name ('like', 'dislike' or 'none')
+    def decide_interaction(self, post, draw=None, rng=random):
+        return ACTIONS[self.decide_action(post, draw, rng)]
+
+    # Move to the running mean of liked post coordinates (running-average rule)
+    def update_experiment_x_y(self, post):
+        self.liked_sum_x += post.experiment_x
+        self.liked_sum_y += post.experiment_y
+        self.num_liked += 1
+        if self.liked_history is not None:
+            self.liked_history.append((post.experiment_x, post.experiment_y))
+        self.experiment_x = max(-5, min(5, self.liked_sum_x / self.num_liked))
+        self.experiment_y = max(-5, min(5, self.liked_sum_y / self.num_liked))
+
+    # Move slightly toward a liked post (rubber-band rule)
+    def rubber_band_adjustment(self, post, pull_strength=0.1):
+        delta_x = pull_strength * (post.experiment_x - self.experiment_x)
+        delta_y = pull_strength * (post.experiment_y - self.experiment_y)
+        self.experiment_x = max(-5, min(5, self.experiment_x + delta_x))
+        self.experiment_y = max(-5, min(5, self.experiment_y + delta_y))
+
+    def __repr__(self):
+        return f"User({self.user_id}, {self.name}, {self.quality}, {self.x}, {self.y}, {self.experiment_x}, {self.experiment_y}, {self.experiment_quality}, {self.user_type})"
+
+
+# Class to represent a post created by users
+class Post:
+    # Fixed attribute slots keep each post small and attribute access fast
+    __slots__ = ('post_id', 'user_id', 'quality', 'x', 'y', 'experiment_x', 'experiment_y', 'experiment_quality',
+                 'likes', 'dislikes', 'total_likers_x', 'total_likers_y')
+
+    def __init__(self, post_id, user_id, quality, x, y):
+        self.post_id = post_id
+        self.user_id = user_id
+        self.quality = quality  # Post quality score between 0 and 1
+        self.x = max(-5, min(5, x))  # Ensure x is within the range
+        self.y = max(-5, min(5, y))  # Ensure y is within the range
+        self.experiment_x = self.x  # Experimental x-coordinate
+        self.experiment_y = self.y  # Experimental y-coordinate
+        self.experiment_quality = 5000  # Default experimental quality, ranges between 0 and 10000
+        self.likes = 0  # Number of likes received
+        self.dislikes = 0  # Number of dislikes received
+        self.total_likers_x = 0  # Sum of x-coordinates of liking users (running-average rule)
+        self.total_likers_y = 0  # Sum of y-coordinates of liking users (running-average rule)
+
+    # Handle interaction from a user, adjust metrics and return the action code applied.
+    # How the user and post move on a like is up to the update rule. draw is the uniform
+    # variate behind the decision, taken from rng when not given.
+    def interact(self, user, update_rule=None, draw=None, rng=random):
+        action = user.decide_action(self, draw, rng)
+        distance = ((user.experiment_x - self.experiment_x) ** 2 + (user.experiment_y - self.experiment_y) ** 2) ** 0.5
+        if action == LIKE:
+            self.likes += 1
+            (update_rule or DEFAULT_UPDATE_RULE).move(user, self)
+
+            # Boost experimental quality based on user interaction
+            quality_boost = (1 - distance / 10) * user.experiment_quality / 10000
+            self.experiment_quality = min(10000, self.experiment_quality + quality_boost * 100)
+
+        elif action == DISLIKE:
+            self.dislikes += 1
+            # Reduce experimental quality if disliked
+            quality_drop = (1 - distance / 10) * user.experiment_quality / 10000
+            self.experiment_quality = max(0, self.experiment_quality - quality_drop * 100)
+        return action
+
+    # Move slightly toward a user who liked the post (rubber-band rule)
+    def rubber_band_adjustment(self, user, pull_strength=0.1):
+        delta_x = pull_strength * (user.experiment_x - self.experiment_x)
+        delta_y = pull_strength * (user.experiment_y - self.experiment_y)
+        self.experiment_x = max(-5, min(5, self.experiment_x + delta_x))
+        self.experiment_y = max(-5, min(5, self.experiment_y + delta_y))
+
+    def __repr__(self):
+        return f"Post({self.post_id}, User {self.user_id}, {self.quality}, {self.x}, {self.y}, {self.experiment_x}, {self.experiment_y}, {self.experiment_quality}, Likes: {self.likes}, Dislikes: {self.dislikes})"
+
+
+# Generate a random value within a given range
+def generate_distribution_value(range_start=-2, range_end=2, rng=random):
+    return rng.uniform(range_start, range_end)
+
+
+# Create a set of users with types drawn from the interaction model's mix.
+# Every attribute is drawn in one block by population.generate_users, in the order the
+# array engine's populate takes them, so a NumPy Generator seeded the same way yields
+# the same population on both engines. distributions is keyed by SimulationArrays
+# column, e.g. {'user_x': population.Triangular(-5, 0, 5)}.
+def create_users(num_users, model='classic', history_size=0, rng=random, distributions=None):
+    columns = generate_users(num_users, get_model(model), rng, split_distributions(distributions)[0])
+    return [User(user_id, user_name(user_id), quality, x, y, USER_TYPES[code], history_size, experiment_x=ex,
+                 experiment_y=ey)
+            for user_id, quality, x, y, code, ex, ey in zip(*(columns[name].tolist() for name in (
+                'user_id', 'quality', 'x', 'y', 'user_type', 'experiment_x', 'experiment_y')))]
+
+
+# Create num_posts_per_user posts for each user in turn, all drawn in one block by
+# population.generate_posts; the same posts as calling create_post that many times
+def create_posts(users, num_posts_per_user, rng=random, distributions=None):
+    columns = generate_posts([user.user_id for user in users], num_posts_per_user, rng,
+                             split_distributions(distributions)[1])
+    return [Post(post_id, user_id, quality, x, y)
+            for post_id, user_id, quality, x, y in zip(*(columns[name].tolist() for name in (
+                'post_id', 'user_id', 'quality', 'x', 'y')))]
@@ -0,0 +1,72 @@
+import argparse
+import math
+import os
+from concurrent.futures import ProcessPoolExecutor
+from itertools import repeat
+
+import numpy as np
+
+from . import engine
+from .strategies import VARIANTS
+
+# z-score for a two-sided 95% confidence interval (normal approximation)
+Z_95 = 1.959963984540054
+
+
+# Run one replicate on the array engine with its own seed and return the error metrics
+def run_replicate(variant, num_users, num_posts_per_user, seed):
+    rng = np.random.default_rng(seed)
+    sim = engine.simulate(num_users, num_posts_per_user, rng=rng, **VARIANTS[variant])
+    return engine.error_metrics(sim)
+
+
+# Run independent replicates across a process pool. Every replicate gets a child of
+# one root SeedSequence, so replicate k always sees the same stream for a given seed
+# no matter how many workers there are or which worker picks it up.
+def run_replicates(variant, num_replicates, num_users=100, num_posts_per_user=5, seed=None, max_workers=None):
+    root = np.random.SeedSequence(seed)
+    seeds = root.spawn(num_replicates)
+    workers = max_workers or os.cpu_count() or 1
+    chunksize = max(1, num_replicates // (4 * workers))
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        results = list(pool.map(run_replicate, repeat(variant), repeat(num_users), repeat(num_posts_per_user),
+                                seeds, chunksize=chunksize))
+    return root.entropy, results
+
+
+# Mean, standard deviation and confidence interval of each metric over the replicates
+def summarize(results, z=Z_95):
+    rows = []
+    for metric in results[0]:
+        values = np.array([result[metric] for result in results])
+        n = len(values)
+        mean = values.mean()
+        std = values.std(ddof=1) if n > 1 else 0.0
+        half_width = z * std / math.sqrt(n)
+        rows.append({'metric': metric, 'n': n, 'mean': mean, 'std': std,
+                     'ci_low': mean - half_width, 'ci_high': mean + half_width})
+    return rows
+
+
+# Print the summary rows as a fixed-width table
+def print_summary(rows):
+    print(f"{'Metric':<10}{'N':>6}{'Mean':>12}{'Std':>12}{'95% CI':>26}")
+    for row in rows:
+        ci = f"[{row['ci_low']:.2f}, {row['ci_high']:.2f}]"
+        print(f"{row['metric']:<10}{row['n']:>6}{row['mean']:>12.2f}{row['std']:>12.2f}{ci:>26}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run repeated simulations and report error metrics with CIs")
+    parser.add_argument('variant', choices=sorted(VARIANTS))
+    parser.add_argument('--replicates', type=int, default=100)
+    parser.add_argument('--users', type=int, default=100)
+    parser.add_argument('--posts-per-user', type=int, default=5)
+    parser.add_argument('--seed', type=int, default=None)
+    parser.add_argument('--workers', type=int, default=None)
+    args = parser.parse_args()
+
+    entropy, results = run_replicates(args.variant, args.replicates, args.users, args.posts_per_user,
+                                      args.seed, args.workers)
+    print(f"Root seed: {entropy}")
+    print_summary(summarize(results))
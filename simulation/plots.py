@@ -0,0 +1,298 @@
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from matplotlib.figure import Figure
+
+from .instrumentation import NULL_TIMER
+
+# pyplot and seaborn are imported inside the seaborn plot functions, so the fast
+# plotter (and a background worker running it) never loads them
+
+# Base names of the image files a plot run writes
+PLOT_NAMES = ['user_distributions', 'post_distributions', 'post_quality_comparison']
+
+# Cells per side of the grid the fast densities are computed on, over [-5, 5]
+GRID_BINS = 200
+EXTENT = 5.0
+
+
+# Heatmaps of user positions (actual vs experimental)
+def plot_user_distributions(user_df, suffix='', directory='.'):
+    import matplotlib.pyplot as plt
+    import seaborn as sns
+
+    plt.figure(figsize=(10, 8))
+
+    plt.subplot(2, 1, 1)
+    sns.kdeplot(
+        x=user_df['x'],
+        y=user_df['y'],
+        cmap="Blues",
+        fill=True,
+        cbar=True,
+        thresh=0
+    )
+    plt.xlim(-5, 5)
+    plt.ylim(-5, 5)
+    plt.title("User Distribution (Actual)")
+    plt.xlabel("X Coordinate")
+    plt.ylabel("Y Coordinate")
+
+    plt.subplot(2, 1, 2)
+    sns.kdeplot(
+        x=user_df['experiment_x'],
+        y=user_df['experiment_y'],
+        cmap="Greens",
+        fill=True,
+        cbar=True,
+        thresh=0
+    )
+    plt.xlim(-5, 5)
+    plt.ylim(-5, 5)
+    plt.title("User Distribution (Experimental)")
+    plt.xlabel("X Coordinate")
+    plt.ylabel("Y Coordinate")
+
+    plt.tight_layout()
+    plt.savefig(os.path.join(directory, f"user_distributions{suffix}.png"))
+
+
+# Heatmaps of post positions (actual vs experimental)
+def plot_post_distributions(post_df, suffix='', directory='.'):
+    import matplotlib.pyplot as plt
+    import seaborn as sns
+
+    plt.figure(figsize=(10, 8))
+
+    plt.subplot(2, 1, 1)
+    sns.kdeplot(
+        x=post_df['x'],
+        y=post_df['y'],
+        cmap="Reds",
+        fill=True,
+        cbar=True,
+        thresh=0
+    )
+    plt.xlim(-5, 5)
+    plt.ylim(-5, 5)
+    plt.title("Post Distribution (Actual)")
+    plt.xlabel("X Coordinate")
+    plt.ylabel("Y Coordinate")
+
+    plt.subplot(2, 1, 2)
+    sns.kdeplot(
+        x=post_df['experiment_x'],
+        y=post_df['experiment_y'],
+        cmap="Purples",
+        fill=True,
+        cbar=True,
+        thresh=0
+    )
+    plt.xlim(-5, 5)
+    plt.ylim(-5, 5)
+    plt.title("Post Distribution (Experimental)")
+    plt.xlabel("X Coordinate")
+    plt.ylabel("Y Coordinate")
+
+    plt.tight_layout()
+    plt.savefig(os.path.join(directory, f"post_distributions{suffix}.png"))
+
+
+# Experimental vs actual quality of the top and bottom 10 posts
+def plot_quality_comparison(post_df, suffix='', directory='.'):
+    import matplotlib.pyplot as plt
+
+    plt.figure(figsize=(12, 10))
+
+    # Top 10 Posts by Actual Quality
+    top_posts = post_df.sort_values(by='quality', ascending=False).head(10)
+    bar_width = 0.4
+    index = range(len(top_posts))
+
+    plt.subplot(2, 1, 1)
+    plt.bar(index, top_posts['experiment_quality'], bar_width, label='Experimental Quality', color='purple')
+    plt.bar([i + bar_width for i in index], top_posts['quality'] * 10000, bar_width, label='Actual Quality', color='orange')
+
+    plt.xlabel("Post ID")
+    plt.ylabel("Quality")
+    plt.title("Top 10 Posts by Experimental and Actual Quality")
+    plt.xticks([i + bar_width / 2 for i in index], top_posts['post_id'].astype(str))
+    plt.legend()
+
+    # Bottom 10 Posts by Actual Quality
+    bottom_posts = post_df.sort_values(by='quality').head(10)
+    index = range(len(bottom_posts))
+
+    plt.subplot(2, 1, 2)
+    plt.bar(index, bottom_posts['experiment_quality'], bar_width, label='Experimental Quality', color='purple')
+    plt.bar([i + bar_width for i in index], bottom_posts['quality'] * 10000, bar_width, label='Actual Quality', color='orange')
+
+    plt.xlabel("Post ID")
+    plt.ylabel("Quality")
+    plt.title("Bottom 10 Posts by Experimental and Actual Quality")
+    plt.xticks([i + bar_width / 2 for i in index], bottom_posts['post_id'].astype(str))
+    plt.legend()
+
+    plt.tight_layout()
+    plt.savefig(os.path.join(directory, f"post_quality_comparison{suffix}.png"))
+
+
+# Paths of the images save_plots writes for a suffix and directory
+def plot_paths(suffix='', directory='.'):
+    return [os.path.join(directory, f"{name}{suffix}.png") for name in PLOT_NAMES]
+
+
+# Save the user/post distribution heatmaps and the quality bar charts into directory.
+# suffix is appended to each file name, e.g. "_test2". style='fast' draws them with
+# FastPlotter on the Agg backend instead of seaborn.
+def save_plots(user_df, post_df, suffix='', directory='.', timer=NULL_TIMER, style='seaborn'):
+    if style == 'fast':
+        FastPlotter().save(user_df, post_df, suffix, directory, timer)
+        return
+    with timer.stage('plot_users'):
+        plot_user_distributions(user_df, suffix, directory)
+    with timer.stage('plot_posts'):
+        plot_post_distributions(post_df, suffix, directory)
+    with timer.stage('plot_quality'):
+        plot_quality_comparison(post_df, suffix, directory)
+
+
+# Binned Gaussian KDE of (x, y) on a fixed GRID_BINS x GRID_BINS grid: points are
+# counted into cells with histogram2d and the counts smoothed with a Gaussian along
+# each axis, as two small matrix products. Cost is O(n + bins^3) however many points
+# there are. Bandwidths follow Scott's rule per axis, as seaborn's kdeplot does.
+def binned_density(x, y, bins=GRID_BINS, extent=EXTENT):
+    x = np.asarray(x, dtype=float)
+    y = np.asarray(y, dtype=float)
+    counts, edges, _ = np.histogram2d(x, y, bins=bins, range=[[-extent, extent], [-extent, extent]])
+    cell = edges[1] - edges[0]
+    centers = (edges[:-1] + edges[1:]) / 2
+    scott = max(len(x), 1) ** (-1 / 6)
+
+    def smoothing(values):
+        sigma = max(scott * float(np.std(values)) if len(values) else 0.0, cell)
+        offsets = (centers[:, None] - centers[None, :]) / sigma
+        return np.exp(-0.5 * offsets ** 2) * cell / (np.sqrt(2 * np.pi) * sigma)
+
+    # counts is indexed [x cell, y cell]; transpose so rows run along y for imshow
+    density = smoothing(y) @ counts.T @ smoothing(x).T
+    return density / (max(len(x), 1) * cell * cell)
+
+
+# Draw one density panel onto ax the way the seaborn plots are laid out
+def draw_density(fig, ax, x, y, cmap, title):
+    image = ax.imshow(binned_density(x, y), origin='lower', extent=(-EXTENT, EXTENT, -EXTENT, EXTENT),
+                      cmap=cmap, aspect='auto', interpolation='bilinear')
+    fig.colorbar(image, ax=ax)
+    ax.set_xlim(-5, 5)
+    ax.set_ylim(-5, 5)
+    ax.set_title(title)
+    ax.set_xlabel("X Coordinate")
+    ax.set_ylabel("Y Coordinate")
+
+
+# Experimental vs actual quality bars for the given posts
+def draw_quality_bars(ax, post_id, quality, experiment_quality, title):
+    bar_width = 0.4
+    index = np.arange(len(post_id))
+    ax.bar(index, experiment_quality, bar_width, label='Experimental Quality', color='purple')
+    ax.bar(index + bar_width, quality * 10000, bar_width, label='Actual Quality', color='orange')
+    ax.set_xlabel("Post ID")
+    ax.set_ylabel("Quality")
+    ax.set_title(title)
+    ax.set_xticks(index + bar_width / 2)
+    ax.set_xticklabels([str(i) for i in post_id])
+    ax.legend()
+
+
+# Fast replacement for the seaborn plots: the same three files, with densities from
+# binned_density instead of kdeplot. Figures are drawn straight onto the non-interactive
+# Agg canvas without going through pyplot, and kept between calls, so plotting many
+# runs reuses three figure objects. Takes DataFrames or any mapping of column name to
+# array, e.g. SimulationArrays columns.
+class FastPlotter:
+    def __init__(self):
+        self.figures = {}
+
+    def figure(self, name, figsize):
+        fig = self.figures.get(name)
+        if fig is None:
+            fig = self.figures[name] = Figure(figsize=figsize)
+            FigureCanvasAgg(fig)
+        fig.clear()
+        return fig
+
+    def plot_user_distributions(self, users, suffix='', directory='.'):
+        fig = self.figure('users', (10, 8))
+        top, bottom = fig.subplots(2, 1)
+        draw_density(fig, top, users['x'], users['y'], "Blues", "User Distribution (Actual)")
+        draw_density(fig, bottom, users['experiment_x'], users['experiment_y'], "Greens",
+                     "User Distribution (Experimental)")
+        fig.tight_layout()
+        fig.savefig(os.path.join(directory, f"user_distributions{suffix}.png"))
+
+    def plot_post_distributions(self, posts, suffix='', directory='.'):
+        fig = self.figure('posts', (10, 8))
+        top, bottom = fig.subplots(2, 1)
+        draw_density(fig, top, posts['x'], posts['y'], "Reds", "Post Distribution (Actual)")
+        draw_density(fig, bottom, posts['experiment_x'], posts['experiment_y'], "Purples",
+                     "Post Distribution (Experimental)")
+        fig.tight_layout()
+        fig.savefig(os.path.join(directory, f"post_distributions{suffix}.png"))
+
+    def plot_quality_comparison(self, posts, suffix='', directory='.'):
+        fig = self.figure('quality', (12, 10))
+        top, bottom = fig.subplots(2, 1)
+        quality = np.asarray(posts['quality'])
+        order = np.argsort(quality, kind='stable')
+        for ax, chosen, title in ((top, order[::-1][:10], "Top 10 Posts by Experimental and Actual Quality"),
+                                  (bottom, order[:10], "Bottom 10 Posts by Experimental and Actual Quality")):
+            draw_quality_bars(ax, np.asarray(posts['post_id'])[chosen], quality[chosen],
+                              np.asarray(posts['experiment_quality'])[chosen], title)
+        fig.tight_layout()
+        fig.savefig(os.path.join(directory, f"post_quality_comparison{suffix}.png"))
+
+    def save(self, users, posts, suffix='', directory='.', timer=NULL_TIMER):
+        with timer.stage('plot_users'):
+            self.plot_user_distributions(users, suffix, directory)
+        with timer.stage('plot_posts'):
+            self.plot_post_distributions(posts, suffix, directory)
+        with timer.stage('plot_quality'):
+            self.plot_quality_comparison(posts, suffix, directory)
+
+
+# Columns the plots read, copied out as plain arrays so they pickle cheaply
+USER_PLOT_COLUMNS = ['x', 'y', 'experiment_x', 'experiment_y']
+POST_PLOT_COLUMNS = ['post_id', 'x', 'y', 'experiment_x', 'experiment_y', 'quality', 'experiment_quality']
+
+_worker_plotter = None
+
+
+def _plot_in_worker(users, posts, suffix, directory):
+    global _worker_plotter
+    if _worker_plotter is None:
+        _worker_plotter = FastPlotter()
+    _worker_plotter.save(users, posts, suffix, directory)
+
+
+# Renders fast plots in a separate process so the next simulation can start while the
+# last one is drawn. submit() returns a Future; close() waits for every pending plot.
+class BackgroundPlotter:
+    def __init__(self):
+        self.pool = ProcessPoolExecutor(max_workers=1)
+
+    def submit(self, users, posts, suffix='', directory='.'):
+        users = {name: np.asarray(users[name]) for name in USER_PLOT_COLUMNS}
+        posts = {name: np.asarray(posts[name]) for name in POST_PLOT_COLUMNS}
+        return self.pool.submit(_plot_in_worker, users, posts, suffix, directory)
+
+    def close(self):
+        self.pool.shutdown(wait=True)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
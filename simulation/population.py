@@ -0,0 +1,149 @@
+import numpy as np
+
+from .sampling import cumulative, sample_codes, uniform_array
+from .strategies import USER_TYPES
+
+
+# Distribution of one population attribute, given as its inverse CDF: values() maps
+# uniform draws in [0, 1) to values. Every distribution therefore takes exactly one
+# draw per value, so swapping one changes no other attribute and both engines still
+# build the same population from the same stream.
+class Distribution:
+    def values(self, draws):
+        raise NotImplementedError
+
+
+class Uniform(Distribution):
+    def __init__(self, low, high):
+        self.low = low
+        self.high = high
+
+    # low + (high - low) * draw, the formula random.uniform uses
+    def values(self, draws):
+        return self.low + (self.high - self.low) * draws
+
+    def __repr__(self):
+        return f"Uniform({self.low}, {self.high})"
+
+
+# Peaked at mode, falling off linearly to low and high
+class Triangular(Distribution):
+    def __init__(self, low, mode, high):
+        if not low <= mode <= high or low == high:
+            raise ValueError(f"Triangular needs low <= mode <= high with low < high, got {low}, {mode}, {high}")
+        self.low = low
+        self.mode = mode
+        self.high = high
+
+    def values(self, draws):
+        low, mode, high = self.low, self.mode, self.high
+        split = (mode - low) / (high - low)
+        return np.where(draws < split,
+                        low + np.sqrt(draws * (high - low) * (mode - low)),
+                        high - np.sqrt((1 - draws) * (high - low) * (high - mode)))
+
+    def __repr__(self):
+        return f"Triangular({self.low}, {self.mode}, {self.high})"
+
+
+# Weighted mix of distributions, e.g. two clusters for a polarised population. The
+# draw picks the component by its weight and is then rescaled to that component.
+class Mixture(Distribution):
+    def __init__(self, components, weights=None):
+        self.components = list(components)
+        self.weights = list(weights) if weights is not None else [1] * len(self.components)
+        if len(self.weights) != len(self.components):
+            raise ValueError(f"Expected {len(self.components)} mixture weights, got {len(self.weights)}")
+
+    def values(self, draws):
+        upper = np.array(cumulative(self.weights))
+        lower = np.concatenate([[0.0], upper[:-1]])
+        codes = sample_codes(upper, draws)
+        result = np.empty(np.shape(draws))
+        for k, component in enumerate(self.components):
+            mask = codes == k
+            result[mask] = component.values((draws[mask] - lower[k]) / (upper[k] - lower[k]))
+        return result
+
+    def __repr__(self):
+        return f"Mixture({self.components}, {self.weights})"
+
+
+# Attributes drawn for every user and post, and how, in the order each row of draws is laid out
+USER_DISTRIBUTIONS = {
+    'quality': Uniform(0, 1),
+    'x': Uniform(-5, 5),
+    'y': Uniform(-5, 5),
+    'experiment_x': Uniform(-2, 2),
+    'experiment_y': Uniform(-2, 2),
+}
+POST_DISTRIBUTIONS = {
+    'quality': Uniform(0, 1),
+    'x': Uniform(-5, 5),
+    'y': Uniform(-5, 5),
+}
+
+
+# Defaults with some attributes' distributions replaced
+def with_overrides(defaults, overrides):
+    unknown = set(overrides or ()) - set(defaults)
+    if unknown:
+        raise ValueError(f"No distribution for {sorted(unknown)}; expected some of {sorted(defaults)}")
+    return dict(defaults, **(overrides or {}))
+
+
+# Split distributions keyed by SimulationArrays column name ('user_x', 'post_quality',
+# ...) into the user and post overrides generate_users / generate_posts take
+def split_distributions(distributions):
+    tables = {'user': {}, 'post': {}}
+    for name, distribution in (distributions or {}).items():
+        table, _, attribute = name.partition('_')
+        if attribute not in {'user': USER_DISTRIBUTIONS, 'post': POST_DISTRIBUTIONS}.get(table, ()):
+            raise ValueError(f"No distribution for {name!r}; expected one of "
+                             f"{['user_' + n for n in USER_DISTRIBUTIONS] + ['post_' + n for n in POST_DISTRIBUTIONS]}")
+        tables[table][attribute] = distribution
+    return tables['user'], tables['post']
+
+
+# Name of a user, derived from its id when it is asked for
+def user_name(user_id):
+    return f"User{user_id}"
+
+
+# Every user attribute as an array, from one (num_users, 6) block of draws whose rows
+# are laid out in the order create_users used to take them one user at a time: quality,
+# x, y, type, experiment_x, experiment_y. user_type holds codes into USER_TYPES; names
+# are not generated (see user_name). distributions replaces entries of USER_DISTRIBUTIONS.
+def generate_users(num_users, model, rng, distributions=None):
+    distributions = with_overrides(USER_DISTRIBUTIONS, distributions)
+    draws = uniform_array((num_users, 6), rng)
+    codes = np.array([USER_TYPES.index(t) for t in model.user_types], dtype=np.int8)
+    return {
+        'user_id': np.arange(1, num_users + 1),
+        # Python's round, as the object path always used; np.round can differ in the last place
+        'quality': np.array([round(quality, 2)
+                             for quality in distributions['quality'].values(draws[:, 0]).tolist()]),
+        'x': distributions['x'].values(draws[:, 1]),
+        'y': distributions['y'].values(draws[:, 2]),
+        'user_type': codes[sample_codes(cumulative(model.type_weights), draws[:, 3])],
+        'experiment_x': distributions['experiment_x'].values(draws[:, 4]),
+        'experiment_y': distributions['experiment_y'].values(draws[:, 5]),
+    }
+
+
+# Every post attribute as an array, from one (num_posts, 3) block of draws: quality, x,
+# y per post. Each user creates num_posts_per_user posts in turn; with num_posts larger
+# than that (a round run) the same order repeats. Positions are clipped to [-5, 5] as
+# Post does. distributions replaces entries of POST_DISTRIBUTIONS.
+def generate_posts(user_ids, num_posts_per_user, rng, distributions=None, num_posts=None):
+    distributions = with_overrides(POST_DISTRIBUTIONS, distributions)
+    if num_posts is None:
+        num_posts = len(user_ids) * num_posts_per_user
+    draws = uniform_array((num_posts, 3), rng)
+    return {
+        'post_id': np.arange(1, num_posts + 1),
+        'user_id': np.resize(np.repeat(user_ids, num_posts_per_user), num_posts),
+        'quality': distributions['quality'].values(draws[:, 0]),
+        'x': np.clip(distributions['x'].values(draws[:, 1]), -5, 5),
+        'y': np.clip(distributions['y'].values(draws[:, 2]), -5, 5),
+    }
@@ -0,0 +1,76 @@
+import numpy as np
+
+
+# How a ranked feed orders candidate posts for a user: a score per (user, post) pair
+# from the post's quality factor (experiment_quality / 10000) and its distance to the
+# user's experimental position. Higher scores are shown first.
+class RankingPolicy:
+    name = None
+
+    def scores(self, quality_factor, distance):
+        raise NotImplementedError
+
+
+# Best posts overall, wherever they are
+class QualityRanking(RankingPolicy):
+    name = 'quality'
+
+    def scores(self, quality_factor, distance):
+        return np.broadcast_to(quality_factor, distance.shape)
+
+
+# Nearest posts, whatever their quality
+class ProximityRanking(RankingPolicy):
+    name = 'proximity'
+
+    def scores(self, quality_factor, distance):
+        return -distance
+
+
+# Weighted mix of the two, each scaled to about [0, 1]
+class BlendRanking(RankingPolicy):
+    name = 'blend'
+
+    def __init__(self, quality_weight=0.5):
+        self.quality_weight = quality_weight
+
+    def scores(self, quality_factor, distance):
+        return self.quality_weight * quality_factor + (1 - self.quality_weight) * (1 - distance / 10)
+
+
+RANKINGS = {
+    'quality': QualityRanking,
+    'proximity': ProximityRanking,
+    'blend': BlendRanking,
+}
+
+
+# Build a ranking policy by name; policy objects are passed through
+def get_ranking(ranking):
+    if not isinstance(ranking, str):
+        return ranking
+    if ranking not in RANKINGS:
+        raise ValueError(f"Unknown feed ranking {ranking!r}; expected one of {sorted(RANKINGS)}")
+    return RANKINGS[ranking]()
+
+
+# Column indices of the k highest scores in each row, best first. argpartition finds
+# them in O(n) per row; only those k are then sorted, tied ones in post order.
+def top_k(scores, k):
+    k = min(k, scores.shape[-1])
+    if k < scores.shape[-1]:
+        chosen = np.argpartition(-scores, k - 1, axis=-1)[..., :k]
+    else:
+        chosen = np.broadcast_to(np.arange(k), scores.shape)
+    order = np.lexsort((chosen, -np.take_along_axis(scores, chosen, axis=-1)), axis=-1)
+    return np.take_along_axis(chosen, order, axis=-1)
+
+
+# Feeds for a batch of users at once: the k posts policy ranks highest for each user
+# in users, as a (len(users), k) array of post indices, best first. Every user in the
+# batch is scored against the state of sim at the time of the call.
+def ranked_feeds(sim, users, k, policy):
+    dx = sim.user_experiment_x[users, None] - sim.post_experiment_x
+    dy = sim.user_experiment_y[users, None] - sim.post_experiment_y
+    distance = np.sqrt(dx * dx + dy * dy)
+    return top_k(policy.scores(sim.post_experiment_quality / 10000, distance), k)
@@ -0,0 +1,110 @@
+import argparse
+import math
+
+import numpy as np
+
+from . import engine
+from .instrumentation import NULL_TIMER
+from .metrics import METRICS
+from .strategies import ACTIONS, BEHAVIORS, VARIANTS, get_model
+
+
+# What a round run looked like after selected rounds. Every array is allocated for all
+# snapshots up front, so thousands of rounds cost one block of memory instead of a
+# growing list of objects; user coordinates are kept as float32 to halve it.
+class RoundSnapshots:
+    def __init__(self, num_snapshots, num_users):
+        self.round = np.zeros(num_snapshots, dtype=np.int64)  # Round number, counted from 1
+        self.user_experiment_x = np.zeros((num_snapshots, num_users), dtype=np.float32)
+        self.user_experiment_y = np.zeros((num_snapshots, num_users), dtype=np.float32)
+        self.metrics = np.zeros((num_snapshots, len(METRICS)))  # Columns follow METRICS
+        self.action_counts = np.zeros((num_snapshots, len(ACTIONS)), dtype=np.int64)  # Applied in that round
+        self.size = 0
+
+    # Store the state of sim after round_number; only the first num_posts posts exist yet
+    def record(self, round_number, sim, num_posts, action_counts):
+        k = self.size
+        self.round[k] = round_number
+        self.user_experiment_x[k] = sim.user_experiment_x
+        self.user_experiment_y[k] = sim.user_experiment_y
+        self.metrics[k] = list(engine.error_metrics(sim, num_posts).values())
+        self.action_counts[k] = action_counts
+        self.size = k + 1
+
+    # One metric across the snapshots taken so far
+    def metric(self, name):
+        return self.metrics[:self.size, METRICS.index(name)]
+
+    def save(self, path):
+        np.savez(path, metric_names=np.array(METRICS), action_names=np.array(ACTIONS),
+                 round=self.round[:self.size], user_experiment_x=self.user_experiment_x[:self.size],
+                 user_experiment_y=self.user_experiment_y[:self.size], metrics=self.metrics[:self.size],
+                 action_counts=self.action_counts[:self.size])
+
+
+# Run num_rounds rounds on the array engine. In each round every user creates
+# posts_per_round posts and then every user, in order, goes through the posts created
+# that round. With feed_size set, each user instead sees a random feed_size of all the
+# posts created so far, so older posts keep moving. A snapshot is taken every
+# snapshot_every rounds and after the last one. Returns the final state and the snapshots.
+def simulate_rounds(num_users, num_rounds, posts_per_round=1, model='classic', update_rule='average',
+                    pull_strength=0.1, type_weights=None, history_size=0, feed_size=None, snapshot_every=1,
+                    rng=None, timer=NULL_TIMER, events=None, distributions=None):
+    if rng is None:
+        rng = np.random.default_rng()
+    new_posts = num_users * posts_per_round
+    with timer.stage('create_population'):
+        # Posts never depend on the state of the run, so every round's posts are drawn up front
+        sim = engine.SimulationArrays(num_users, new_posts * num_rounds, update_rule, pull_strength, history_size)
+        engine.populate(sim, posts_per_round, get_model(model, type_weights), rng, distributions)
+    sim.events = events
+    snapshots = RoundSnapshots(math.ceil(num_rounds / snapshot_every), num_users)
+
+    with timer.stage('rounds'):
+        for r in range(num_rounds):
+            start = r * new_posts
+            end = start + new_posts
+            counts_before = sim.action_counts.sum(axis=0)
+            for i in range(num_users):
+                if feed_size is not None:
+                    feed = np.sort(rng.choice(end, min(feed_size, end), replace=False))
+                    engine.feed_pass(sim, i, feed, rng.random(len(feed)))
+                elif BEHAVIORS[sim.user_type[i]].corner_only:
+                    engine.corner_pass(sim, i, start, new_posts)
+                else:
+                    engine.user_pass(sim, i, rng.random(new_posts), start)
+            if (r + 1) % snapshot_every == 0 or r == num_rounds - 1:
+                snapshots.record(r + 1, sim, end, sim.action_counts.sum(axis=0) - counts_before)
+    return sim, snapshots
+
+
+# Print one row of metrics per snapshot
+def print_snapshots(snapshots):
+    print(f"{'Round':>8}" + "".join(f"{name:>10}" for name in METRICS) + f"{'Interact':>10}")
+    for k in range(snapshots.size):
+        counts = snapshots.action_counts[k]
+        rate = (counts[0] + counts[1]) / counts.sum() if counts.sum() else 0.0
+        print(f"{snapshots.round[k]:>8}" + "".join(f"{value:>10.2f}" for value in snapshots.metrics[k])
+              + f"{rate:>10.2%}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run a variant over several rounds and report per-round metrics")
+    parser.add_argument('variant', choices=sorted(VARIANTS))
+    parser.add_argument('--rounds', type=int, default=100)
+    parser.add_argument('--users', type=int, default=100)
+    parser.add_argument('--posts-per-round', type=int, default=1, help="Posts each user creates per round")
+    parser.add_argument('--feed-size', type=int, help="Posts each user sees per round, drawn from all posts so far")
+    parser.add_argument('--snapshot-every', type=int, default=1)
+    parser.add_argument('--pull-strength', type=float, default=0.1)
+    parser.add_argument('--seed', type=int, default=None)
+    parser.add_argument('--output', help="Save the snapshots to this .npz file")
+    args = parser.parse_args()
+
+    _, snapshots = simulate_rounds(args.users, args.rounds, args.posts_per_round, pull_strength=args.pull_strength,
+                                   feed_size=args.feed_size, snapshot_every=args.snapshot_every,
+                                   rng=np.random.default_rng(args.seed), **VARIANTS[args.variant])
+    print_snapshots(snapshots)
+    if args.output:
+        snapshots.save(args.output)
+        print(f"Snapshots written to {args.output}")
@@ -0,0 +1,35 @@
+import random
+from itertools import accumulate
+
+import numpy as np
+
+
+# Cumulative weights normalised to end at 1, computed once per distribution
+def cumulative(weights):
+    cum = list(accumulate(weights))
+    cum = [w / cum[-1] for w in cum]
+    cum[-1] = 1.0  # Rounding must never leave a draw past the last category
+    return cum
+
+
+# Category code of each uniform draw: the index of the first cumulative weight above
+# it, the lookup random.choices does on every call
+def sample_codes(cum_weights, draws):
+    return np.searchsorted(np.asarray(cum_weights), draws, side='right')
+
+
+# One pass worth of uniform draws in a single call instead of one call per pair.
+# rng is the random module, a random.Random or a NumPy Generator; a Generator fills
+# the block in one call and yields the same values as n separate random() calls.
+def uniform_block(n, rng=random):
+    if isinstance(rng, np.random.Generator):
+        return rng.random(n).tolist()
+    return [rng.random() for _ in range(n)]
+
+
+# Block of uniform draws shaped like shape, filled in row-major order: the values a
+# loop taking one random() call per cell would see, in one call for a Generator
+def uniform_array(shape, rng=random):
+    if isinstance(rng, np.random.Generator):
+        return rng.random(shape)
+    return np.array(uniform_block(int(np.prod(shape)), rng)).reshape(shape)
@@ -0,0 +1,208 @@
+import argparse
+import heapq
+import time
+
+import numpy as np
+
+from . import engine
+from .instrumentation import NULL_TIMER
+from .metrics import METRICS
+from .strategies import VARIANTS, get_model, in_corner
+
+# Event kinds, in the order they are handled when two fall on the same time
+ARRIVAL, POST, VIEW, EXPIRE = range(4)
+EVENT_NAMES = ['arrival', 'post', 'view', 'expire']
+
+# Post columns of SimulationArrays and the value a new post starts with in each
+POST_COLUMNS = {
+    'post_id': 0,
+    'post_user_id': 0,
+    'post_quality': 0.0,
+    'post_x': 0.0,
+    'post_y': 0.0,
+    'post_experiment_x': 0.0,
+    'post_experiment_y': 0.0,
+    'post_experiment_quality': 5000.0,
+    'likes': 0,
+    'dislikes': 0,
+    'total_likers_x': 0.0,
+    'total_likers_y': 0.0,
+}
+
+
+# Growable post table inside a SimulationArrays. Posts are given slots in sim's post
+# columns: a new post takes the slot of an expired one when there is one, and the
+# columns double in size when every slot is in use, so adding and removing a post are
+# O(1) and the columns never outgrow twice the largest number of live posts. Ids come
+# from a counter rather than the length of a list. live[:num_live] holds the slots in
+# use, in no particular order.
+class PostStore:
+    def __init__(self, sim, capacity=1024):
+        self.sim = sim
+        self.next_id = 1
+        self.size = 0  # Slots handed out so far, live or free
+        self.free = []  # Slots of expired posts, reused first
+        self.live = np.zeros(capacity, dtype=np.int64)
+        self.position = np.zeros(capacity, dtype=np.int64)  # Index of each live slot in live
+        self.num_live = 0
+        for name in POST_COLUMNS:
+            setattr(sim, name, np.zeros(capacity, dtype=getattr(sim, name).dtype))
+
+    @property
+    def capacity(self):
+        return len(self.live)
+
+    def grow(self):
+        capacity = 2 * self.capacity
+        for name in list(POST_COLUMNS) + ['live', 'position']:
+            owner = self if name in ('live', 'position') else self.sim
+            column = getattr(owner, name)
+            grown = np.zeros(capacity, dtype=column.dtype)
+            grown[:len(column)] = column
+            setattr(owner, name, grown)
+
+    # Add a post by user_id and return its slot
+    def add(self, user_id, quality, x, y):
+        if self.free:
+            slot = self.free.pop()
+        else:
+            if self.size == self.capacity:
+                self.grow()
+            slot = self.size
+            self.size += 1
+        sim = self.sim
+        for name, value in POST_COLUMNS.items():
+            getattr(sim, name)[slot] = value
+        sim.post_id[slot] = self.next_id
+        sim.post_user_id[slot] = user_id
+        sim.post_quality[slot] = quality
+        sim.post_x[slot] = sim.post_experiment_x[slot] = x
+        sim.post_y[slot] = sim.post_experiment_y[slot] = y
+        if sim.track_corners and in_corner(x, y):
+            sim.corner_posts.add(slot)
+        self.next_id += 1
+        self.live[self.num_live] = slot
+        self.position[slot] = self.num_live
+        self.num_live += 1
+        return slot
+
+    # Remove the post in slot; the last live slot takes its place in live
+    def remove(self, slot):
+        k = self.position[slot]
+        last = self.live[self.num_live - 1]
+        self.live[k] = last
+        self.position[last] = k
+        self.num_live -= 1
+        self.free.append(slot)
+        self.sim.corner_posts.discard(slot)
+
+    # Slots of the live posts
+    def live_slots(self):
+        return self.live[:self.num_live]
+
+
+# Error metrics as engine.error_metrics reports them, with the posts limited to the live ones
+def live_metrics(sim, store):
+    def rmse(actual, experimental):
+        return float(np.sqrt(np.mean((actual - experimental) ** 2))) if len(actual) else float('nan')
+
+    posts = store.live_slots()
+    return dict(zip(METRICS, [
+        rmse(sim.user_x, sim.user_experiment_x),
+        rmse(sim.user_y, sim.user_experiment_y),
+        rmse(sim.post_x[posts], sim.post_experiment_x[posts]),
+        rmse(sim.post_y[posts], sim.post_experiment_y[posts]),
+        rmse(sim.post_quality[posts] * 10000, sim.post_experiment_quality[posts]),
+    ]))
+
+
+# Event-driven run in which posting and reading interleave. Everything happens at a
+# time on a heapq of (time, sequence, kind, subject) events:
+#   ARRIVAL - user i joins; arrivals are a Poisson process of arrival_rate per unit time
+#   POST    - a user who has joined creates a post, post_rate times per unit time on average
+#   VIEW    - a user reads a feed of feed_size posts sampled from the live ones, through
+#             engine.feed_pass, view_rate times per unit time on average
+#   EXPIRE  - a post is removed post_lifetime after it was created
+# Each user has at most one pending POST and VIEW event and each live post one EXPIRE,
+# so the queue and the post store stay proportional to the users and the live posts
+# however long the run is. The run stops at time duration. Returns the final state,
+# the post store and the number of events handled per kind.
+def simulate_events(num_users, duration, model='classic', update_rule='average', pull_strength=0.1,
+                    type_weights=None, history_size=0, arrival_rate=10.0, post_rate=0.2, view_rate=1.0, feed_size=10,
+                    post_lifetime=20.0, rng=None, timer=NULL_TIMER, events=None):
+    if rng is None:
+        rng = np.random.default_rng()
+    with timer.stage('create_population'):
+        sim = engine.SimulationArrays(num_users, 0, update_rule, pull_strength, history_size)
+        engine.populate(sim, 0, get_model(model, type_weights), rng)
+        store = PostStore(sim)
+    sim.events = events
+
+    queue = []
+    sequence = 0
+    counts = [0] * len(EVENT_NAMES)
+
+    def schedule(when, kind, subject):
+        nonlocal sequence
+        if when <= duration:
+            heapq.heappush(queue, (when, sequence, kind, subject))
+            sequence += 1
+
+    if num_users:
+        schedule(rng.exponential(1 / arrival_rate), ARRIVAL, 0)
+    with timer.stage('events'):
+        while queue:
+            now, _, kind, subject = heapq.heappop(queue)
+            counts[kind] += 1
+            if kind == ARRIVAL:
+                if subject + 1 < num_users:
+                    schedule(now + rng.exponential(1 / arrival_rate), ARRIVAL, subject + 1)
+                schedule(now + rng.exponential(1 / post_rate), POST, subject)
+                schedule(now + rng.exponential(1 / view_rate), VIEW, subject)
+            elif kind == POST:
+                # Same draws as User.create_post: quality, then x and y in [-5, 5)
+                quality, x, y = rng.random(3).tolist()
+                slot = store.add(sim.user_id.item(subject), quality, -5 + 10 * x, -5 + 10 * y)
+                schedule(now + post_lifetime, EXPIRE, slot)
+                schedule(now + rng.exponential(1 / post_rate), POST, subject)
+            elif kind == VIEW:
+                size = min(feed_size, store.num_live)
+                if size:
+                    feed = store.live_slots()[rng.choice(store.num_live, size, replace=False)]
+                    # Oldest first, as the posts were created
+                    feed = feed[np.argsort(sim.post_id[feed])]
+                    engine.feed_pass(sim, subject, feed, rng.random(size))
+                schedule(now + rng.exponential(1 / view_rate), VIEW, subject)
+            else:
+                store.remove(subject)
+    return sim, store, dict(zip(EVENT_NAMES, counts))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run a variant as a stream of timed posting and reading events")
+    parser.add_argument('variant', choices=sorted(VARIANTS))
+    parser.add_argument('--users', type=int, default=1000)
+    parser.add_argument('--duration', type=float, default=200.0, help="Simulated time to run for")
+    parser.add_argument('--arrival-rate', type=float, default=10.0, help="Users joining per unit time")
+    parser.add_argument('--post-rate', type=float, default=0.2, help="Posts per user per unit time")
+    parser.add_argument('--view-rate', type=float, default=1.0, help="Feed reads per user per unit time")
+    parser.add_argument('--feed-size', type=int, default=10, help="Posts in each feed read")
+    parser.add_argument('--post-lifetime', type=float, default=20.0, help="Time a post stays live")
+    parser.add_argument('--seed', type=int, default=None)
+    args = parser.parse_args()
+
+    started = time.perf_counter()
+    sim, store, handled = simulate_events(args.users, args.duration, arrival_rate=args.arrival_rate,
+                                          post_rate=args.post_rate, view_rate=args.view_rate,
+                                          feed_size=args.feed_size, post_lifetime=args.post_lifetime,
+                                          rng=np.random.default_rng(args.seed), **VARIANTS[args.variant])
+    elapsed = time.perf_counter() - started
+    if sim.total_interactions:
+        engine.print_interaction_summary(sim.action_tallies())
+    total = sum(handled.values())
+    print(f"\n{total} events in {elapsed:.2f}s ({total / elapsed:,.0f}/s): "
+          + ", ".join(f"{count} {name}" for name, count in handled.items()))
+    print(f"{store.num_live} live posts of {store.next_id - 1} created; {store.capacity} slots allocated")
+    print("\nStandard Deviations (live posts):")
+    for name, value in live_metrics(sim, store).items():
+        print(f"{name}: {value:.2f}")
@@ -0,0 +1,201 @@
+import os
+from multiprocessing import get_context
+from multiprocessing.connection import wait
+from multiprocessing.shared_memory import SharedMemory
+
+import numpy as np
+
+from . import engine
+from .instrumentation import NULL_TIMER
+from .strategies import BEHAVIORS, get_model
+
+# How shards are combined:
+#   'exact'   - shards form a pipeline. Worker k runs a batch of users on its posts once
+#               worker k - 1 has finished that batch, so each user reaches shard k with
+#               the position the earlier shards left it at. Results are bit-identical
+#               to engine.simulate with the same Generator.
+#   'relaxed' - every worker runs the same batch at the same time, each starting the
+#               users from where the previous batch left them. Between batches the moves
+#               made on each shard are merged by the update rule (liked sums add up,
+#               rubber-band pulls are chained in shard order). Within a pass a user's
+#               likes on one shard do not move it for the others, so likes on later
+#               shards are decided from an older position and the posts liked there are
+#               pulled toward it. The like history is not supported.
+MODES = ['exact', 'relaxed']
+
+# User columns a pass writes; in relaxed mode each worker keeps its own copy of these
+USER_STATE = ['user_experiment_x', 'user_experiment_y', 'liked_sum_x', 'liked_sum_y', 'num_liked']
+
+
+# Update rule wrapper that counts each user's likes, which the rubber-band merge needs
+class CountingRule:
+    def __init__(self, rule, num_users):
+        self.rule = rule
+        self.likes = np.zeros(num_users, dtype=np.int64)
+
+    def move_arrays(self, sim, i, j, ux, uy):
+        self.likes[i] += 1
+        return self.rule.move_arrays(sim, i, j, ux, uy)
+
+    def move_local(self, state, j, ux, uy):
+        self.likes[state.i] += 1
+        return self.rule.move_local(state, j, ux, uy)
+
+
+# Copy arrays into new shared memory blocks. Returns the blocks, views of them and the
+# (block name, shape, dtype) spec a worker needs to attach to each.
+def share(arrays):
+    blocks, views, specs = {}, {}, {}
+    for name, array in arrays.items():
+        block = SharedMemory(create=True, size=max(array.nbytes, 1))
+        view = np.ndarray(array.shape, dtype=array.dtype, buffer=block.buf)
+        view[...] = array
+        blocks[name], views[name] = block, view
+        specs[name] = (block.name, array.shape, array.dtype.str)
+    return blocks, views, specs
+
+
+def attach(specs):
+    blocks = {name: SharedMemory(name=block) for name, (block, _, _) in specs.items()}
+    views = {name: np.ndarray(shape, dtype=dtype, buffer=blocks[name].buf)
+             for name, (_, shape, dtype) in specs.items()}
+    return blocks, views
+
+
+# SimulationArrays whose columns are the given shared views
+def shared_sim(views, config):
+    sim = engine.SimulationArrays(0, 0, config['update_rule'], config['pull_strength'], config['history_size'])
+    for name, view in views.items():
+        if hasattr(sim, name):
+            setattr(sim, name, view)
+    return sim
+
+
+# Body of worker k: every user's pass over posts lo:hi, batch by batch
+def shard_worker(k, specs, bounds, config, start_state, batch_size, mode, turns, barrier):
+    blocks, views = attach(specs)
+    sim = shared_sim(views, config)
+    sim.action_counts = views['worker_counts'][k]
+    sim.refresh_corners()
+    num_users, num_workers = sim.num_users, len(bounds) - 1
+    lo, hi = int(bounds[k]), int(bounds[k + 1])
+
+    # Draws a sequential run takes before user i's pass: one block of num_posts per
+    # user that is not corner-only. The generator jumps straight to this shard's slice.
+    takes_draws = np.array([not BEHAVIORS[code].corner_only for code in sim.user_type.tolist()])
+    draws_before = (np.cumsum(takes_draws) - takes_draws) * sim.num_posts
+    bit_generator = getattr(np.random, start_state['bit_generator'])()
+    generator = np.random.Generator(bit_generator)
+
+    if mode == 'relaxed':
+        merged = shared_sim(views, config)
+        for name in USER_STATE:
+            setattr(sim, name, views[name].copy())
+        sim.update_rule = CountingRule(sim.update_rule, num_users)
+        moves = views['shard_moves'][k]
+
+    for first in range(0, num_users, batch_size):
+        users = slice(first, min(num_users, first + batch_size))
+        if mode == 'exact' and k > 0:
+            turns[k].acquire()
+        elif mode == 'relaxed':
+            for name in USER_STATE:
+                getattr(sim, name)[users] = views[name][users]
+            sim.update_rule.likes[users] = 0
+
+        for i in range(users.start, users.stop):
+            if takes_draws[i]:
+                bit_generator.state = start_state
+                bit_generator.advance(int(draws_before[i]) + lo)
+                engine.user_pass(sim, i, generator.random(hi - lo), lo)
+            else:
+                engine.corner_pass(sim, i, lo, hi - lo)
+
+        if mode == 'exact':
+            if k + 1 < num_workers:
+                turns[k + 1].release()
+            continue
+        # Where this shard left each user, what it added to the liked sums and how many
+        # likes it made, for worker 0 to merge once every shard is done
+        count = users.stop - users.start
+        moves[0, :count] = sim.user_experiment_x[users]
+        moves[1, :count] = sim.user_experiment_y[users]
+        moves[2, :count] = sim.liked_sum_x[users] - views['liked_sum_x'][users]
+        moves[3, :count] = sim.liked_sum_y[users] - views['liked_sum_y'][users]
+        moves[4, :count] = sim.num_liked[users] - views['num_liked'][users]
+        moves[5, :count] = sim.update_rule.likes[users]
+        barrier.wait()
+        if k == 0:
+            shard_moves = views['shard_moves'][:, :, :count]
+            merged.liked_sum_x[users] += shard_moves[:, 2].sum(axis=0)
+            merged.liked_sum_y[users] += shard_moves[:, 3].sum(axis=0)
+            merged.num_liked[users] += np.rint(shard_moves[:, 4].sum(axis=0)).astype(np.int64)
+            merged.update_rule.merge_arrays(merged, users, shard_moves[:, 0], shard_moves[:, 1], shard_moves[:, 5])
+        barrier.wait()
+
+
+# Run the simulation with its posts split over num_workers processes that share every
+# column through multiprocessing.shared_memory. mode picks how the shards are combined
+# (see MODES); users go through in batches of batch_size. rng must have a jumpable bit
+# generator (PCG64, the default) so each worker can take its own slice of the draws;
+# it is left where a sequential run would leave it.
+def simulate_sharded(num_users, num_posts_per_user, model='classic', update_rule='average', pull_strength=0.1,
+                     type_weights=None, history_size=0, rng=None, timer=NULL_TIMER, num_workers=None,
+                     batch_size=1000, mode='exact', distributions=None):
+    if mode not in MODES:
+        raise ValueError(f"Unknown shard mode {mode!r}; expected one of {MODES}")
+    if mode == 'relaxed' and history_size:
+        raise ValueError("The like history needs the exact shard mode")
+    if rng is None:
+        rng = np.random.default_rng()
+    if not hasattr(rng.bit_generator, 'advance'):
+        raise ValueError(f"Sharded runs need a jumpable bit generator, not {type(rng.bit_generator).__name__}")
+
+    with timer.stage('create_population'):
+        sim = engine.SimulationArrays(num_users, num_users * num_posts_per_user, update_rule, pull_strength,
+                                      history_size)
+        engine.populate(sim, num_posts_per_user, get_model(model, type_weights), rng, distributions)
+    num_workers = max(1, min(num_workers or os.cpu_count() or 1, sim.num_posts))
+    bounds = np.linspace(0, sim.num_posts, num_workers + 1).astype(np.int64)
+    config = {'update_rule': sim.update_rule, 'pull_strength': pull_strength, 'history_size': history_size}
+    start_state = rng.bit_generator.state
+
+    with timer.stage('interactions'):
+        columns = {name: value for name, value in vars(sim).items()
+                   if isinstance(value, np.ndarray) and name != 'action_counts'}
+        columns['worker_counts'] = np.zeros((num_workers,) + sim.action_counts.shape, dtype=np.int64)
+        if mode == 'relaxed':
+            columns['shard_moves'] = np.zeros((num_workers, 6, min(batch_size, num_users)))
+        blocks, views, specs = share(columns)
+        try:
+            context = get_context()
+            turns = [context.Semaphore(0) for _ in range(num_workers)]
+            barrier = context.Barrier(num_workers)
+            workers = [context.Process(target=shard_worker, args=(k, specs, bounds, config, start_state, batch_size,
+                                                                  mode, turns, barrier))
+                       for k in range(num_workers)]
+            for worker in workers:
+                worker.start()
+            pending = {worker.sentinel: worker for worker in workers}
+            while pending:
+                for sentinel in wait(list(pending)):
+                    worker = pending.pop(sentinel)
+                    worker.join()
+                    if worker.exitcode != 0:
+                        # The others may be waiting on this one, so stop them too
+                        for other in pending.values():
+                            other.terminate()
+                        raise RuntimeError(f"Shard worker exited with code {worker.exitcode}")
+            for name, value in columns.items():
+                value[...] = views[name]
+        finally:
+            views.clear()
+            for block in blocks.values():
+                block.close()
+                block.unlink()
+        sim.action_counts[...] = columns['worker_counts'].sum(axis=0)
+        sim.refresh_corners()
+
+    takes_draws = sum(not BEHAVIORS[code].corner_only for code in sim.user_type.tolist())
+    rng.bit_generator.advance(takes_draws * sim.num_posts)
+    return sim
@@ -0,0 +1,48 @@
+import math
+
+import numpy as np
+
+
+# Uniform grid over the [-5, 5] square holding post indices by their experimental
+# coordinates. Posts are re-filed when they move, so range queries stay exact while
+# the simulation runs; a query only looks at the cells its radius overlaps.
+class PostGrid:
+    def __init__(self, post_x, post_y, cell_size=1.0, extent=5.0):
+        self.cell_size = cell_size
+        self.extent = extent
+        self.cells_per_side = max(1, math.ceil(2 * extent / cell_size))
+        self.post_x = post_x  # Arrays the grid indexes; moved posts must be reported via move()
+        self.post_y = post_y
+        self.cell_of = self.cell_index(post_x, post_y)
+        self.cells = [[] for _ in range(self.cells_per_side ** 2)]
+        for j, cell in enumerate(self.cell_of.tolist()):
+            self.cells[cell].append(j)
+
+    # Row-major cell number of each coordinate pair (scalars or arrays)
+    def cell_index(self, x, y):
+        last = self.cells_per_side - 1
+        col = np.clip(((np.asarray(x) + self.extent) // self.cell_size).astype(np.int64), 0, last)
+        row = np.clip(((np.asarray(y) + self.extent) // self.cell_size).astype(np.int64), 0, last)
+        return row * self.cells_per_side + col
+
+    # Re-file post j after its coordinates in post_x / post_y changed
+    def move(self, j):
+        cell = int(self.cell_index(self.post_x.item(j), self.post_y.item(j)))
+        old = self.cell_of.item(j)
+        if cell != old:
+            self.cells[old].remove(j)
+            self.cells[cell].append(j)
+            self.cell_of[j] = cell
+
+    # Indices of the posts within radius of (x, y), in ascending order
+    def query(self, x, y, radius):
+        last = self.cells_per_side - 1
+        col_lo, col_hi = (min(last, max(0, int((v + self.extent) // self.cell_size))) for v in (x - radius, x + radius))
+        row_lo, row_hi = (min(last, max(0, int((v + self.extent) // self.cell_size))) for v in (y - radius, y + radius))
+        candidates = []
+        for row in range(row_lo, row_hi + 1):
+            for cell in self.cells[row * self.cells_per_side + col_lo:row * self.cells_per_side + col_hi + 1]:
+                candidates.extend(cell)
+        candidates = np.array(candidates, dtype=np.int64)
+        near = (self.post_x[candidates] - x) ** 2 + (self.post_y[candidates] - y) ** 2 <= radius * radius
+        return np.sort(candidates[near])
@@ -0,0 +1,289 @@
+import numpy as np
+
+# Integer action codes; strings only appear when results are reported
+ACTIONS = ['like', 'dislike', 'none']
+LIKE, DISLIKE, NONE = 0, 1, 2
+
+# Extremists only like posts at least this far from the origin in both x and y
+CORNER = 3.5
+
+
+# Whether a post position lies in one of the four corners; works on scalars and arrays
+def in_corner(x, y):
+    return (abs(x) >= CORNER) & (abs(y) >= CORNER)
+
+
+# How one type of user reacts to a post. The probability formulas work the same on
+# scalars (the object path) and on NumPy arrays (the array engine), so each type's
+# rule is written once.
+class UserBehavior:
+    name = None
+    position_independent = False  # True when likes do not depend on where the user is
+    can_dislike = True
+    corner_only = False  # True when only corner posts (see in_corner) ever get a reaction
+
+    # Like and dislike probabilities for a post at the given distance and quality factor
+    def probabilities(self, distance, quality_factor):
+        raise NotImplementedError
+
+    # Map one uniform draw to an action code, the same lookup random.choices performs
+    def decide(self, distance, quality_factor, draw, post_x, post_y):
+        prob_like, prob_dislike = self.probabilities(distance, quality_factor)
+        if draw < prob_like:
+            return LIKE
+        if draw < prob_like + prob_dislike:
+            return DISLIKE
+        return NONE
+
+    # Squared distance below which each post is liked, for a whole pass at once.
+    # prob_like only falls with distance, so "draw < prob_like" is the same test as
+    # "distance < radius" with a per-post radius that does not depend on the user.
+    def like_radius_sq(self, quality_factor, draws, post_ex, post_ey):
+        raise NotImplementedError
+
+    # Dislike mask for a batch of posts already known not to be liked
+    def dislikes(self, distance, quality_factor, draws):
+        prob_like, prob_dislike = self.probabilities(distance, quality_factor)
+        return (draws >= prob_like) & (draws < prob_like + prob_dislike)
+
+
+# Random users interact with no clear pattern
+class RandomBehavior(UserBehavior):
+    name = 'random'
+    position_independent = True
+
+    def probabilities(self, distance, quality_factor):
+        return 0.15, 0.15
+
+    def like_radius_sq(self, quality_factor, draws, post_ex, post_ey):
+        return np.where(draws < 0.15, np.inf, -1.0)
+
+
+# Users tend to like posts closer to them and with high quality
+class AgreeBehavior(UserBehavior):
+    name = 'agree'
+
+    def probabilities(self, distance, quality_factor):
+        prob_like = 0.4 * (1 - distance / 10) + 0.3 * quality_factor
+        prob_dislike = 0.3 * (distance / 10) + 0.2 * (1 - quality_factor)
+        return prob_like, prob_dislike
+
+    def like_radius_sq(self, quality_factor, draws, post_ex, post_ey):
+        radius = (0.4 + 0.3 * quality_factor - draws) / 0.04
+        return np.where(radius > 0, radius * radius, -1.0)
+
+
+# Users interact based more on quality than proximity
+class QualityBehavior(UserBehavior):
+    name = 'quality'
+
+    def probabilities(self, distance, quality_factor):
+        prob_like = 0.5 * quality_factor + 0.2 * (1 - distance / 10)
+        prob_dislike = 0.4 * (distance / 10) + 0.3 * (1 - quality_factor)
+        return prob_like, prob_dislike
+
+    def like_radius_sq(self, quality_factor, draws, post_ex, post_ey):
+        radius = (0.2 + 0.5 * quality_factor - draws) / 0.02
+        return np.where(radius > 0, radius * radius, -1.0)
+
+
+# Users only like posts far from the origin in both x and y
+class ExtremistBehavior(UserBehavior):
+    name = 'extremist'
+    position_independent = True
+    can_dislike = False
+    corner_only = True
+
+    def decide(self, distance, quality_factor, draw, post_x, post_y):
+        if in_corner(post_x, post_y):
+            return LIKE
+        return NONE
+
+    def like_radius_sq(self, quality_factor, draws, post_ex, post_ey):
+        return np.where(in_corner(post_ex, post_ey), np.inf, -1.0)
+
+    def dislikes(self, distance, quality_factor, draws):
+        return np.zeros(len(draws), dtype=bool)
+
+
+# Every known user type; a user's type code is its index in this list
+BEHAVIORS = [RandomBehavior(), AgreeBehavior(), QualityBehavior(), ExtremistBehavior()]
+USER_TYPES = [behavior.name for behavior in BEHAVIORS]
+BEHAVIOR_BY_NAME = {behavior.name: behavior for behavior in BEHAVIORS}
+
+
+# Interaction model: which user types take part and how often each occurs
+class InteractionModel:
+    def __init__(self, name, user_types, type_weights):
+        self.name = name
+        self.user_types = list(user_types)
+        self.type_weights = list(type_weights)
+
+    # Same model with a different type mix, e.g. for parameter sweeps
+    def with_weights(self, type_weights):
+        if len(type_weights) != len(self.user_types):
+            raise ValueError(f"Expected {len(self.user_types)} type weights, got {len(type_weights)}")
+        return InteractionModel(self.name, self.user_types, type_weights)
+
+
+MODELS = {
+    'classic': InteractionModel('classic', ['random', 'agree', 'quality'], [0.3, 0.4, 0.3]),
+    'extremist': InteractionModel('extremist', ['random', 'agree', 'quality', 'extremist'],
+                                  [0.25, 0.25, 0.25, 0.25]),
+}
+
+
+# Post and user both move to the mean position of what they liked (Test1/Test3)
+class RunningAverage:
+    name = 'average'
+
+    # Object path: called after post.likes has been incremented
+    def move(self, user, post):
+        post.total_likers_x += user.experiment_x
+        post.total_likers_y += user.experiment_y
+        post.experiment_x = max(-5, min(5, post.total_likers_x / post.likes))
+        post.experiment_y = max(-5, min(5, post.total_likers_y / post.likes))
+        user.update_experiment_x_y(post)
+
+    # Array path: same update on column j / row i; takes and returns the user's
+    # coordinates so a pass can keep them in local floats
+    def move_arrays(self, sim, i, j, ux, uy):
+        num_likes = sim.likes.item(j)
+        total_x = sim.total_likers_x.item(j) + ux
+        total_y = sim.total_likers_y.item(j) + uy
+        sim.total_likers_x[j] = total_x
+        sim.total_likers_y[j] = total_y
+        px = sim.post_experiment_x[j] = max(-5, min(5, total_x / num_likes))
+        py = sim.post_experiment_y[j] = max(-5, min(5, total_y / num_likes))
+        # Running mean of liked post coordinates, O(1) per like
+        count = sim.num_liked.item(i)
+        if sim.history_size:
+            sim.liked_history[i, count % sim.history_size] = (px, py)
+        count += 1
+        liked_x = sim.liked_sum_x.item(i) + px
+        liked_y = sim.liked_sum_y.item(i) + py
+        sim.num_liked[i] = count
+        sim.liked_sum_x[i] = liked_x
+        sim.liked_sum_y[i] = liked_y
+        return max(-5, min(5, liked_x / count)), max(-5, min(5, liked_y / count))
+
+    # Pass-local path: the same update on the lists and floats of an engine.PassState,
+    # called after state.likes[j] has been incremented. This runs once per like, so
+    # values are clamped to [-5, 5] with conditionals instead of calls to max and min.
+    def move_local(self, state, j, ux, uy):
+        num_likes = state.likes[j]
+        total_x = state.total_x[j] + ux
+        total_y = state.total_y[j] + uy
+        state.total_x[j] = total_x
+        state.total_y[j] = total_y
+        px = total_x / num_likes
+        py = total_y / num_likes
+        px = state.post_x[j] = -5 if px < -5 else 5 if px > 5 else px
+        py = state.post_y[j] = -5 if py < -5 else 5 if py > 5 else py
+        if state.history is not None:
+            state.history.append((px, py))
+        count = state.num_liked + 1
+        liked_x = state.liked_sum_x + px
+        liked_y = state.liked_sum_y + py
+        state.num_liked = count
+        state.liked_sum_x = liked_x
+        state.liked_sum_y = liked_y
+        ux = liked_x / count
+        uy = liked_y / count
+        return -5 if ux < -5 else 5 if ux > 5 else ux, -5 if uy < -5 else 5 if uy > 5 else uy
+
+    # Settle the position of users whose pass was split over post shards that ran side
+    # by side (sharded.py, relaxed mode). end_x / end_y hold where each shard left the
+    # users and likes how many posts each shard had them like. The liked sums already
+    # hold every shard's likes, so the running mean follows from them.
+    def merge_arrays(self, sim, users, end_x, end_y, likes):
+        count = sim.num_liked[users]
+        liked = count > 0
+        count = np.maximum(count, 1)
+        sim.user_experiment_x[users] = np.where(liked, np.clip(sim.liked_sum_x[users] / count, -5, 5),
+                                                sim.user_experiment_x[users])
+        sim.user_experiment_y[users] = np.where(liked, np.clip(sim.liked_sum_y[users] / count, -5, 5),
+                                                sim.user_experiment_y[users])
+
+
+# User and post pull each other a fraction of the way together (Test2)
+class RubberBand:
+    name = 'rubber_band'
+
+    def __init__(self, pull_strength=0.1):
+        self.pull_strength = pull_strength
+
+    def move(self, user, post):
+        user.rubber_band_adjustment(post, self.pull_strength)
+        post.rubber_band_adjustment(user, self.pull_strength)
+
+    def move_arrays(self, sim, i, j, ux, uy):
+        pull = self.pull_strength
+        px = sim.post_experiment_x.item(j)
+        py = sim.post_experiment_y.item(j)
+        ux = max(-5, min(5, ux + pull * (px - ux)))
+        uy = max(-5, min(5, uy + pull * (py - uy)))
+        sim.post_experiment_x[j] = max(-5, min(5, px + pull * (ux - px)))
+        sim.post_experiment_y[j] = max(-5, min(5, py + pull * (uy - py)))
+        return ux, uy
+
+    # Clamped with conditionals, as in RunningAverage.move_local
+    def move_local(self, state, j, ux, uy):
+        pull = self.pull_strength
+        px = state.post_x[j]
+        py = state.post_y[j]
+        ux += pull * (px - ux)
+        uy += pull * (py - uy)
+        ux = -5 if ux < -5 else 5 if ux > 5 else ux
+        uy = -5 if uy < -5 else 5 if uy > 5 else uy
+        px += pull * (ux - px)
+        py += pull * (uy - py)
+        state.post_x[j] = -5 if px < -5 else 5 if px > 5 else px
+        state.post_y[j] = -5 if py < -5 else 5 if py > 5 else py
+        return ux, uy
+
+    # Each shard's pulls are an affine map of the start position,
+    # x -> (1 - pull)^likes * x + offset, so the shards are chained one after another
+    def merge_arrays(self, sim, users, end_x, end_y, likes):
+        start_x = sim.user_experiment_x[users]
+        start_y = sim.user_experiment_y[users]
+        ux, uy = start_x, start_y
+        for shard_x, shard_y, shard_likes in zip(end_x, end_y, likes):
+            keep = (1 - self.pull_strength) ** shard_likes
+            ux = np.clip(keep * ux + shard_x - keep * start_x, -5, 5)
+            uy = np.clip(keep * uy + shard_y - keep * start_y, -5, 5)
+        sim.user_experiment_x[users] = ux
+        sim.user_experiment_y[users] = uy
+
+
+UPDATE_RULES = {
+    'average': RunningAverage,
+    'rubber_band': RubberBand,
+}
+
+# Model and update rule of each of the original experiment scripts
+VARIANTS = {
+    'test1': {'model': 'classic', 'update_rule': 'average'},
+    'test2': {'model': 'extremist', 'update_rule': 'rubber_band'},
+    'test3': {'model': 'extremist', 'update_rule': 'average'},
+}
+
+
+# Look up an interaction model by name; model objects are passed through
+def get_model(model, type_weights=None):
+    if isinstance(model, str):
+        if model not in MODELS:
+            raise ValueError(f"Unknown interaction model {model!r}; expected one of {sorted(MODELS)}")
+        model = MODELS[model]
+    return model.with_weights(type_weights) if type_weights is not None else model
+
+
+# Build an update rule by name; rule objects are passed through
+def get_update_rule(rule, pull_strength=0.1):
+    if not isinstance(rule, str):
+        return rule
+    if rule not in UPDATE_RULES:
+        raise ValueError(f"Unknown update rule {rule!r}; expected one of {sorted(UPDATE_RULES)}")
+    if rule == 'rubber_band':
+        return RubberBand(pull_strength)
+    return UPDATE_RULES[rule]()
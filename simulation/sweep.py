@@ -0,0 +1,152 @@
+import argparse
+import csv
+import hashlib
+import io
+import itertools
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import numpy as np
+
+from . import engine
+from .strategies import VARIANTS, get_model
+
+# Parameters a sweep can vary, with the value used when a spec leaves them out
+DEFAULTS = {
+    'num_users': 100,
+    'num_posts_per_user': 5,
+    'pull_strength': 0.1,
+    'type_weights': None,  # None keeps the variant's own type mix
+}
+
+
+# Expand a sweep spec into the list of run configurations.
+# A spec looks like:
+#   {"variant": "test2", "replicates": 3, "seed": 0,
+#    "grid": {"num_users": [100, 1000], "pull_strength": [0.05, 0.1]}}
+# or, for random search, "random": {"samples": 50, "params": {...}} where each
+# parameter is {"uniform": [low, high]}, {"int": [low, high]} or {"choice": [...]}.
+# Random configurations are drawn from the spec seed, so the same spec always
+# expands to the same runs and a rerun can find the ones already on disk.
+def expand_spec(spec):
+    variant = spec['variant']
+    replicates = spec.get('replicates', 1)
+    seed = spec.get('seed', 0)
+
+    if 'grid' in spec:
+        names = list(spec['grid'])
+        points = [dict(zip(names, values)) for values in itertools.product(*spec['grid'].values())]
+    else:
+        rng = np.random.default_rng(seed)
+        points = []
+        for _ in range(spec['random']['samples']):
+            point = {}
+            for name, dist in spec['random']['params'].items():
+                if 'uniform' in dist:
+                    point[name] = float(rng.uniform(*dist['uniform']))
+                elif 'int' in dist:
+                    point[name] = int(rng.integers(dist['int'][0], dist['int'][1] + 1))
+                else:
+                    point[name] = dist['choice'][rng.integers(len(dist['choice']))]
+            points.append(point)
+
+    configs = []
+    for point in points:
+        unknown = set(point) - set(DEFAULTS)
+        if unknown:
+            raise ValueError(f"Unknown sweep parameters: {sorted(unknown)}")
+        for replicate in range(replicates):
+            config = dict(DEFAULTS, **point, variant=variant, replicate=replicate, seed=seed)
+            if config['type_weights'] is None:
+                config['type_weights'] = get_model(VARIANTS[variant]['model']).type_weights
+            configs.append(config)
+    return configs
+
+
+# Stable identifier of a configuration, used as its result file name and seed
+def config_key(config):
+    canonical = json.dumps(config, sort_keys=True, separators=(',', ':'))
+    return hashlib.sha256(canonical.encode()).hexdigest()[:20]
+
+
+# Run one configuration in a worker and return its result row
+def run_config(config):
+    key = config_key(config)
+    rng = np.random.default_rng(np.random.SeedSequence([config['seed'], int(key, 16)]))
+    sim = engine.simulate(config['num_users'], config['num_posts_per_user'], pull_strength=config['pull_strength'],
+                          type_weights=config['type_weights'], rng=rng, **VARIANTS[config['variant']])
+    metrics = engine.error_metrics(sim)
+    return key, {
+        'config': config,
+        'interaction_rate': sim.interaction_rate,
+        'metrics': {name.lower().replace(' ', '_'): value for name, value in metrics.items()},
+    }
+
+
+# Write a file so that readers only ever see the old or the complete new contents
+def write_atomic(path, text):
+    tmp_path = f"{path}.tmp{os.getpid()}"
+    with open(tmp_path, 'w') as f:
+        f.write(text)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+
+
+# Run every configuration that has no result on disk yet. Each finished run is
+# written to runs/<key>.json as soon as it completes, so a crashed or interrupted
+# sweep resumes where it stopped; the tidy table is rebuilt from those files.
+def run_sweep(spec, out_dir, max_workers=None):
+    runs_dir = os.path.join(out_dir, 'runs')
+    os.makedirs(runs_dir, exist_ok=True)
+    configs = expand_spec(spec)
+    pending = [config for config in configs
+               if not os.path.exists(os.path.join(runs_dir, f"{config_key(config)}.json"))]
+    print(f"{len(configs)} runs, {len(configs) - len(pending)} already done, {len(pending)} to run")
+
+    if pending:
+        with ProcessPoolExecutor(max_workers=max_workers) as pool:
+            futures = [pool.submit(run_config, config) for config in pending]
+            for done, future in enumerate(as_completed(futures), 1):
+                key, result = future.result()
+                write_atomic(os.path.join(runs_dir, f"{key}.json"), json.dumps(result))
+                if done % 100 == 0 or done == len(pending):
+                    print(f"Finished {done}/{len(pending)}")
+
+    return write_table(configs, runs_dir, os.path.join(out_dir, 'results.csv'))
+
+
+# Collect the results of the given configurations into one row-per-run CSV
+def write_table(configs, runs_dir, path):
+    rows = []
+    for config in configs:
+        with open(os.path.join(runs_dir, f"{config_key(config)}.json")) as f:
+            result = json.load(f)
+        row = {name: value for name, value in config.items() if name != 'type_weights'}
+        user_types = get_model(VARIANTS[config['variant']]['model']).user_types
+        for user_type, weight in zip(user_types, config['type_weights']):
+            row[f"weight_{user_type}"] = weight
+        row['interaction_rate'] = result['interaction_rate']
+        row.update(result['metrics'])
+        rows.append(row)
+
+    fieldnames = list(dict.fromkeys(name for row in rows for name in row))
+    buffer = io.StringIO()
+    writer = csv.DictWriter(buffer, fieldnames=fieldnames, lineterminator='\n')
+    writer.writeheader()
+    writer.writerows(rows)
+    write_atomic(path, buffer.getvalue())
+    return path
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run a resumable parameter sweep")
+    parser.add_argument('spec', help="JSON file with the sweep spec")
+    parser.add_argument('out_dir', help="Directory for per-run results and results.csv")
+    parser.add_argument('--workers', type=int, default=None)
+    args = parser.parse_args()
+
+    with open(args.spec) as f:
+        spec = json.load(f)
+    print(f"Results written to {run_sweep(spec, args.out_dir, args.workers)}")
@@ -0,0 +1,16 @@
+import pytest
+
+from simulation.cache import ResultCache
+from simulation.experiment import test_simulation as run_cached
+
+
+@pytest.mark.parametrize('engine', ['python', 'numpy'])
+def test_cache_hit_prints_what_the_run_printed(tmp_path, monkeypatch, capsys, engine):
+    monkeypatch.chdir(tmp_path)
+    cache = ResultCache(str(tmp_path / 'cache'))
+    outputs = []
+    for _ in range(2):
+        run_cached('test3', engine, num_users=40, num_posts_per_user=3, plots='none', seed=1, cache=cache)
+        outputs.append(capsys.readouterr().out)
+    assert 'Interaction Rate' in outputs[0]
+    assert outputs[1] == outputs[0]
@@ -0,0 +1,59 @@
+import numpy as np
+import pytest
+
+from simulation import engine
+from simulation.kernel import mismatched_columns
+from simulation.strategies import VARIANTS
+
+FEEDS = {
+    'all': {},
+    'neighborhood': {'feed_radius': 3.0, 'feed_size': 10},
+    'ranked': {'feed_rank': 'blend', 'feed_size': 10, 'rank_batch': 5},
+}
+
+
+class Interrupted(Exception):
+    pass
+
+
+# engine.simulate on a seed, saving every 20 users to path
+def run(path, variant, feed, **kwargs):
+    return engine.simulate(100, 3, rng=np.random.default_rng(9), checkpoint=str(path), checkpoint_every=20,
+                           **FEEDS[feed], **VARIANTS[variant], **kwargs)
+
+
+# Make save_checkpoint stop the run right after its second save
+def interrupt_after_second_save(monkeypatch):
+    saves = []
+    save = engine.save_checkpoint
+
+    def save_then_stop(*args):
+        save(*args)
+        saves.append(args[2])
+        if len(saves) == 2:
+            raise Interrupted
+    monkeypatch.setattr(engine, 'save_checkpoint', save_then_stop)
+    return saves
+
+
+@pytest.mark.parametrize('feed', sorted(FEEDS))
+@pytest.mark.parametrize('variant', sorted(VARIANTS))
+def test_resume_matches_uninterrupted_run(tmp_path, monkeypatch, variant, feed):
+    expected = run(tmp_path / 'full.npz', variant, feed)
+    with monkeypatch.context() as patch:
+        saves = interrupt_after_second_save(patch)
+        with pytest.raises(Interrupted):
+            run(tmp_path / 'resumed.npz', variant, feed)
+    assert saves == [20, 40]
+    resumed = run(tmp_path / 'resumed.npz', variant, feed)
+    assert mismatched_columns(expected, resumed) == []
+    assert resumed.corner_posts == expected.corner_posts
+
+
+def test_resume_rejects_another_configuration(tmp_path, monkeypatch):
+    with monkeypatch.context() as patch:
+        interrupt_after_second_save(patch)
+        with pytest.raises(Interrupted):
+            run(tmp_path / 'run.npz', 'test1', 'all')
+    with pytest.raises(ValueError, match="different configuration"):
+        run(tmp_path / 'run.npz', 'test3', 'all')
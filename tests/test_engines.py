@@ -0,0 +1,23 @@
+import numpy as np
+import pytest
+
+from simulation.experiment import run_simulation, to_columns
+from simulation.models import Post, User
+from simulation.strategies import VARIANTS
+
+
+# Users and posts of one seeded run, as columns named like their attributes
+def seeded_columns(engine, variant, history_size, seed=11):
+    users, posts = run_simulation(variant, 80, 4, engine=engine, history_size=history_size,
+                                  rng=np.random.default_rng(seed))
+    return to_columns(users, User.__slots__), to_columns(posts, Post.__slots__)
+
+
+@pytest.mark.parametrize('history_size', [0, 3])
+@pytest.mark.parametrize('variant', sorted(VARIANTS))
+def test_python_and_numpy_engines_agree(variant, history_size):
+    expected = seeded_columns('python', variant, history_size)
+    actual = seeded_columns('numpy', variant, history_size)
+    for python_columns, numpy_columns in zip(expected, actual):
+        for field, column in python_columns.items():
+            assert numpy_columns[field] == column, field
@@ -0,0 +1,25 @@
+import numpy as np
+import pytest
+
+from simulation.events import EventLog
+from simulation.experiment import run_simulation
+
+pq = pytest.importorskip('pyarrow.parquet')
+
+
+# Columns of the event log of one seeded run
+def logged_events(tmp_path, engine, variant):
+    path = str(tmp_path / f'{engine}.parquet')
+    # A small batch size so the log is flushed several times during the run
+    with EventLog(path, batch_size=500) as events:
+        run_simulation(variant, 60, 3, engine=engine, events=events, rng=np.random.default_rng(4))
+    return pq.read_table(path).to_pydict()
+
+
+@pytest.mark.parametrize('variant', ['test1', 'test2', 'test3'])
+def test_numpy_log_follows_interaction_order(tmp_path, variant):
+    expected = logged_events(tmp_path, 'python', variant)
+    actual = logged_events(tmp_path, 'numpy', variant)
+    assert actual['sequence'] == list(range(len(actual['sequence'])))
+    for field in ('action', 'sequence', 'user_id', 'post_id', 'post_x_after', 'post_y_after', 'quality_after'):
+        assert actual[field] == expected[field], field
@@ -0,0 +1,34 @@
+import numpy as np
+import pytest
+
+from simulation import engine, kernel
+from simulation.strategies import VARIANTS
+
+
+# The kernel simulate_jit runs: the plain interaction_pass, or the Numba-compiled one
+# when Numba is installed. Either way simulate_jit takes its compiled path.
+@pytest.fixture(params=['interpreted', 'compiled'])
+def kernel_pass(request, monkeypatch):
+    if request.param == 'compiled':
+        pytest.importorskip('numba')
+        compiled = kernel.compiled_pass()
+    else:
+        compiled = kernel.interaction_pass
+    monkeypatch.setattr(kernel, 'compiled_pass', lambda: compiled)
+
+
+@pytest.mark.parametrize('history_size', [0, 3])
+@pytest.mark.parametrize('variant', sorted(VARIANTS))
+def test_kernel_matches_engine(kernel_pass, variant, history_size):
+    expected = engine.simulate(120, 3, history_size=history_size, rng=np.random.default_rng(5), **VARIANTS[variant])
+    actual = kernel.simulate_jit(120, 3, history_size=history_size, rng=np.random.default_rng(5),
+                                 **VARIANTS[variant])
+    assert kernel.mismatched_columns(expected, actual) == []
+    assert actual.action_counts.tolist() == expected.action_counts.tolist()
+    assert actual.corner_posts == expected.corner_posts
+
+
+def test_mismatch_is_reported():
+    expected = engine.simulate(20, 2, rng=np.random.default_rng(1))
+    actual = engine.simulate(20, 2, rng=np.random.default_rng(2))
+    assert 'user_experiment_x' in kernel.mismatched_columns(expected, actual)
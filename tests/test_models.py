@@ -0,0 +1,15 @@
+import random
+
+import numpy as np
+
+from simulation.models import Post, User
+
+
+def test_interact_draws_from_the_given_rng():
+    user = User(1, 'User1', 0.5, 0.0, 0.0, 'random', experiment_x=0.0, experiment_y=0.0)
+    for seed in range(20):
+        expected = user.decide_action(Post(1, 1, 0.5, 1.0, 1.0), random.Random(seed).random())
+        assert Post(1, 1, 0.5, 1.0, 1.0).interact(user, rng=random.Random(seed)) == expected
+        draw = np.random.default_rng(seed).random()
+        expected = user.decide_action(Post(1, 1, 0.5, 1.0, 1.0), draw)
+        assert Post(1, 1, 0.5, 1.0, 1.0).interact(user, rng=np.random.default_rng(seed)) == expected
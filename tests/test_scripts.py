@@ -0,0 +1,34 @@
+import pytest
+
+import Test1
+import Test2
+import Test3
+
+
+# A user at the origin liking a post at (4.5, 4.5); the draw 0.0 is a like for every type
+def like(module, *args, **kwargs):
+    user = module.User(1, 'User1', 0.5, 0.0, 0.0, 'agree', experiment_x=0.0, experiment_y=0.0)
+    post = module.Post(1, 1, 0.5, 4.5, 4.5)
+    post.interact(user, *args, draw=0.0, **kwargs)
+    return user, post
+
+
+# Values the original Test2.py classes give
+def test_test2_post_uses_the_rubber_band_rule():
+    user, post = like(Test2)
+    assert (user.experiment_x, user.experiment_y) == pytest.approx((0.45, 0.45))
+    assert (post.experiment_x, post.experiment_y) == pytest.approx((4.095, 4.095))
+
+
+def test_test2_post_takes_pull_strength():
+    for user, post in (like(Test2, 0.2), like(Test2, pull_strength=0.2)):
+        assert user.experiment_x == pytest.approx(0.9)
+        assert post.experiment_x == pytest.approx(3.78)
+
+
+@pytest.mark.parametrize('module', [Test1, Test3])
+def test_running_average_scripts(module):
+    user, post = like(module)
+    # The post moves to the mean of its likers and the user to the mean of its likes
+    assert (post.experiment_x, post.experiment_y) == (0.0, 0.0)
+    assert (user.experiment_x, user.experiment_y) == (0.0, 0.0)
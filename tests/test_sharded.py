@@ -0,0 +1,27 @@
+import numpy as np
+import pytest
+
+from simulation import engine
+from simulation.kernel import mismatched_columns
+from simulation.sharded import simulate_sharded
+from simulation.strategies import DISLIKE, LIKE, VARIANTS
+
+
+@pytest.mark.parametrize('variant', sorted(VARIANTS))
+def test_exact_shards_match_simulate(variant):
+    expected = engine.simulate(120, 3, history_size=2, rng=np.random.default_rng(6), **VARIANTS[variant])
+    actual = simulate_sharded(120, 3, history_size=2, rng=np.random.default_rng(6), num_workers=3, batch_size=50,
+                              mode='exact', **VARIANTS[variant])
+    assert mismatched_columns(expected, actual) == []
+    assert actual.corner_posts == expected.corner_posts
+
+
+@pytest.mark.parametrize('variant', sorted(VARIANTS))
+def test_relaxed_shards_merge_action_counts(variant):
+    sim = simulate_sharded(120, 3, rng=np.random.default_rng(6), num_workers=3, batch_size=50, mode='relaxed',
+                           **VARIANTS[variant])
+    # Every user saw every post once, on one shard or another
+    assert sim.total_interactions == 120 * sim.num_posts
+    assert sim.action_counts[:, LIKE].sum() == sim.likes.sum()
+    assert sim.action_counts[:, DISLIKE].sum() == sim.dislikes.sum()
+    assert np.all(np.abs(sim.user_experiment_x) <= 5) and np.all(np.abs(sim.user_experiment_y) <= 5)
@@ -0,0 +1,110 @@
+import numpy as np
+import pytest
+
+from simulation import engine, kernel
+from simulation.models import Post, User
+from simulation.strategies import USER_TYPES
+
+NUM_POSTS = 12
+
+
+# One agree user and NUM_POSTS posts, every other one already liked twice. The user's
+# liked sums and those posts' liker sums are far enough out that the running average
+# lands outside [-5, 5], and some qualities sit near 10000, so the likes hit the clamps.
+def starting_state(update_rule, history_size):
+    rng = np.random.default_rng(3)
+    sim = engine.SimulationArrays(1, NUM_POSTS, update_rule, 0.3, history_size)
+    sim.user_type[0] = USER_TYPES.index('agree')
+    sim.user_experiment_x[0] = 4.5
+    sim.user_experiment_y[0] = -4.5
+    sim.num_liked[0] = 3
+    sim.liked_sum_x[0] = 30.0
+    sim.liked_sum_y[0] = -30.0
+    sim.post_experiment_x[:] = rng.uniform(-3, 3, NUM_POSTS)
+    sim.post_experiment_y[:] = rng.uniform(-3, 3, NUM_POSTS)
+    sim.post_experiment_quality[:] = rng.uniform(5000, 10000, NUM_POSTS)
+    sim.post_experiment_quality[:3] = 9999.5
+    sim.likes[::2] = 2
+    sim.total_likers_x[::2] = 24.0 * rng.choice([-1, 1], NUM_POSTS // 2)
+    sim.total_likers_y[::2] = 24.0 * rng.choice([-1, 1], NUM_POSTS // 2)
+    return sim
+
+
+# The user's and posts' state after the user liked every post in order
+def liked_state(user_x, user_y, num_liked, liked_sum_x, liked_sum_y, history, post_x, post_y, quality, likes,
+                total_x, total_y):
+    return dict(user_x=user_x, user_y=user_y, num_liked=num_liked, liked_sum_x=liked_sum_x,
+                liked_sum_y=liked_sum_y, history=[list(xy) for xy in history], post_x=list(post_x),
+                post_y=list(post_y), quality=list(quality), likes=list(likes), total_x=list(total_x),
+                total_y=list(total_y))
+
+
+def sim_state(sim):
+    return liked_state(sim.user_experiment_x.item(0), sim.user_experiment_y.item(0), sim.num_liked.item(0),
+                       sim.liked_sum_x.item(0), sim.liked_sum_y.item(0),
+                       sim.recent_likes(0).tolist() if sim.history_size else (),
+                       sim.post_experiment_x.tolist(), sim.post_experiment_y.tolist(),
+                       sim.post_experiment_quality.tolist(), sim.likes.tolist(), sim.total_likers_x.tolist(),
+                       sim.total_likers_y.tolist())
+
+
+def distance(ux, uy, sim, j):
+    return ((ux - sim.post_experiment_x.item(j)) ** 2 + (uy - sim.post_experiment_y.item(j)) ** 2) ** 0.5
+
+
+# Object path: Post.interact with update_rule.move; a draw of 0 makes the agree user like
+def object_likes(sim):
+    (user,), posts = sim.to_objects(User, Post)
+    for post in posts:
+        post.interact(user, sim.update_rule, draw=0.0)
+    return liked_state(user.experiment_x, user.experiment_y, user.num_liked, user.liked_sum_x, user.liked_sum_y,
+                       user.liked_history or (), *zip(*((post.experiment_x, post.experiment_y,
+                                                          post.experiment_quality, post.likes, post.total_likers_x,
+                                                          post.total_likers_y) for post in posts)))
+
+
+# Array path: engine.apply_like with update_rule.move_arrays, as corner_pass and feed_pass use it
+def array_likes(sim):
+    ux = sim.user_experiment_x.item(0)
+    uy = sim.user_experiment_y.item(0)
+    for j in range(NUM_POSTS):
+        ux, uy = engine.apply_like(sim, 0, j, ux, uy, distance(ux, uy, sim, j))
+    sim.user_experiment_x[0] = ux
+    sim.user_experiment_y[0] = uy
+    return sim_state(sim)
+
+
+# Pass-local path: engine.PassState with update_rule.move_local, as user_pass uses it
+def local_likes(sim):
+    state = engine.PassState(sim, 0, 0, NUM_POSTS)
+    ux = sim.user_experiment_x.item(0)
+    uy = sim.user_experiment_y.item(0)
+    for j in range(NUM_POSTS):
+        d = ((ux - state.post_x[j]) ** 2 + (uy - state.post_y[j]) ** 2) ** 0.5
+        ux, uy = state.like(j, ux, uy, d)
+    state.commit(sim, 0, [], [])
+    sim.user_experiment_x[0] = ux
+    sim.user_experiment_y[0] = uy
+    return sim_state(sim)
+
+
+# Kernel path: kernel.interaction_pass, which spells out both rules itself
+def kernel_likes(sim):
+    rule = kernel.RULE_CODES[sim.update_rule.name]
+    pull = float(getattr(sim.update_rule, 'pull_strength', 0.0))
+    counts = sim.action_counts[sim.user_type[0]]
+    kernel.interaction_pass(0, np.zeros(NUM_POSTS), sim.user_type.item(0), rule, pull, sim.user_experiment_x,
+                            sim.user_experiment_y, sim.user_experiment_quality, sim.liked_sum_x, sim.liked_sum_y,
+                            sim.num_liked, sim.liked_history, sim.post_experiment_x, sim.post_experiment_y,
+                            sim.post_experiment_quality, sim.likes, sim.dislikes, sim.total_likers_x,
+                            sim.total_likers_y, counts)
+    assert counts.tolist() == [NUM_POSTS, 0, 0]
+    return sim_state(sim)
+
+
+@pytest.mark.parametrize('history_size', [0, 4])
+@pytest.mark.parametrize('update_rule', ['average', 'rubber_band'])
+@pytest.mark.parametrize('copy', [array_likes, local_likes, kernel_likes])
+def test_update_rule_copies_agree(copy, update_rule, history_size):
+    expected = object_likes(starting_state(update_rule, history_size))
+    assert copy(starting_state(update_rule, history_size)) == expected